@@ -0,0 +1,80 @@
+"""Shared worker pool for the heavy calculations behind the pages.
+
+A session runs at most one job per name. Submitting a job under the same name with different
+inputs cancels the old one: a job that has not started is dropped, and a running job that was
+given a ``cancel`` event stops at its next check. Submitting the same inputs again returns
+the job already running, so a rerun caused by an unrelated widget does not restart the work.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import streamlit as st
+
+MAX_WORKERS = os.cpu_count() or 2
+POLL_SECONDS = 0.1
+
+# One pool for every session of the server process
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='mortgage-buddy')
+
+
+def submit(name, key, function, *args, cancellable=False, **kwargs):
+    """Run ``function(*args, **kwargs)`` on the shared pool as this session's ``name`` job.
+
+    ``key`` identifies the inputs. With ``cancellable`` the function is passed a
+    threading.Event as ``cancel``. Returns a Future.
+    """
+    jobs = st.session_state.setdefault('_background_jobs', {})
+    job = jobs.get(name)
+    if job is not None and job['key'] == key and not job['future'].cancelled():
+        return job['future']
+    cancel(name)
+    event = threading.Event()
+    if cancellable:
+        kwargs['cancel'] = event
+    future = _pool.submit(function, *args, **kwargs)
+    jobs[name] = {'key': key, 'future': future, 'cancel': event}
+    return future
+
+
+def cancel(*names):
+    """Cancel this session's jobs with the given names, if any."""
+    jobs = st.session_state.get('_background_jobs', {})
+    for name in names:
+        job = jobs.pop(name, None)
+        if job is not None:
+            job['cancel'].set()
+            job['future'].cancel()
+
+
+def as_ready(futures, status=None):
+    """Yield ``(label, future)`` pairs from a {label: future} dict as each one finishes.
+
+    While waiting, ``status`` (an st.empty placeholder) shows the elapsed time. Updating it
+    gives Streamlit the chance to stop this script when a widget changes, so a stale rerun
+    does not wait for its results.
+    """
+    pending = {future: label for label, future in futures.items()}
+    started = time.perf_counter()
+    while pending:
+        done, _ = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+        if pending and status is not None:
+            status.caption(f"Calculating... {time.perf_counter() - started:.1f}s")
+    if status is not None:
+        status.empty()
+
+
+def completed(value):
+    """A finished Future holding ``value``, for results computed in the script thread."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def result(future, status=None):
+    """Wait for one Future as as_ready does and return its result."""
+    for _, done in as_ready({None: future}, status):
+        return done.result()
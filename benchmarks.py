@@ -0,0 +1,218 @@
+"""Benchmarks and differential accuracy checks for the calculation engines.
+
+    python benchmarks.py --output bench.json
+    python benchmarks.py --baseline bench.json --max-slowdown 1.25
+
+Timings are written as JSON. Given a baseline file, the run fails (exit code 1) if any timing is
+slower than the baseline by more than --max-slowdown, or if any fast path disagrees with the
+reference loops by more than a penny.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from calculations import (
+    ROUNDINGS, Schedule, amortization_schedule, batch_mortgage_scenarios, calculate_mortgage_payments, calculate_mortgage_payments_loop,
+    calculate_schedule, mortgage_summary, pence_grid, pence_schedule, schedule_frame,
+)
+from portfolio import run_portfolio
+from savings_engine import compound_interest_reference, savings_projection
+
+TERMS = (1, 5, 10, 20, 30, 40)
+START = date(2024, 1, 1)
+PENNY = 0.01
+
+
+def _seconds(call, repeat=5):
+    # Best per-call time over several repeats of roughly 0.2s each
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_timings(quick=False):
+    """Return a flat {metric name: seconds} dict."""
+    repeat = 3 if quick else 5
+    results = {}
+    for years in TERMS:
+        args = (3.5, years, 250000, 100, 0, START, 5.0, date(2026, 1, 1))
+        results[f'schedule.{years}y'] = _seconds(lambda: calculate_mortgage_payments(*args), repeat)
+        results[f'schedule_loop.{years}y'] = _seconds(lambda: calculate_mortgage_payments_loop(*args), repeat)
+        results[f'summary.{years}y'] = _seconds(lambda: mortgage_summary(*args), repeat)
+        results[f'pence.{years}y'] = _seconds(lambda: pence_schedule(*args), repeat)
+
+    # The two runs behind one click of "Run Simulation"
+    def simulation_pair(engine):
+        engine(3.5, 30, 250000, 0, 0, START)
+        engine(3.5, 30, 250000, 200, 10000, START, 5.0, date(2027, 1, 1))
+    results['simulation_pair'] = _seconds(lambda: simulation_pair(calculate_mortgage_payments), repeat)
+    results['simulation_pair_loop'] = _seconds(lambda: simulation_pair(calculate_mortgage_payments_loop), repeat)
+
+    schedule = amortization_schedule(3.5, 30, 250000, 100, 0, START)
+    results['dataframe.30y'] = _seconds(lambda: schedule_frame(schedule), repeat)
+    results['compact.30y'] = _seconds(lambda: Schedule(schedule), repeat)
+    compact = Schedule(schedule)
+    results['arrow.30y'] = _seconds(compact.to_arrow, repeat)
+
+    scenarios = 2000 if quick else 10000
+    rng = np.random.default_rng(0)
+    extra, lump, rate = rng.uniform(0, 2000, scenarios), rng.uniform(0, 50000, scenarios), rng.uniform(1, 8, scenarios)
+    when = np.array([date(2028, 1, 1)] * scenarios, dtype=object)
+    seconds = _seconds(lambda: batch_mortgage_scenarios(3.5, 30, 250000, extra, lump, START, rate, when), repeat=max(1, repeat - 2))
+    results['batch.per_scenario'] = seconds / scenarios
+    seconds = _seconds(lambda: batch_mortgage_scenarios(3.5, 30, 250000, extra, lump, START, rate, when, rounding='half_even'), repeat=max(1, repeat - 2))
+    results['pence_batch.per_scenario'] = seconds / scenarios
+
+    results['savings.30y'] = _seconds(lambda: savings_projection(10000, 5.0, 30, 2.0, True), repeat)
+    results['savings_loop.30y'] = _seconds(lambda: compound_interest_reference(10000, 5.0, 2.0, 30, True), repeat)
+
+    # A portfolio run with full schedules at the default chunk size, in-process
+    loans = 5000 if quick else 20000
+    with tempfile.TemporaryDirectory() as folder:
+        pd.DataFrame({
+            'balance': rng.uniform(5e4, 6e5, loans).round(2), 'interest_rate': rng.uniform(1, 7, loans).round(2), 'years_left': rng.integers(20, 36, loans),
+        }).to_parquet(os.path.join(folder, 'loans.parquet'))
+        paths = [os.path.join(folder, name) for name in ('loans.parquet', 'summaries.parquet', 'schedules.parquet')]
+        results['portfolio_schedules.per_loan'] = run_portfolio(*paths, processes=1, progress=None)['seconds'] / loans
+    return results
+
+
+def _random_scenario(rng):
+    balance = rng.choice([250000, round(rng.uniform(1000, 2e6), 2)])
+    scenario = {
+        'interest_rate': rng.choice([0.0, 3.5, round(rng.uniform(0, 12), 2)]),
+        'years_left': rng.randint(1, 40),
+        'balance': balance,
+        'additional_repayment': rng.choice([0, 100, round(rng.uniform(0, 5000), 2)]),
+        'lump_sum': rng.choice([0, 10000]) if balance > 20000 else 0,
+        'start_date': date(rng.randint(2020, 2030), rng.randint(1, 12), rng.randint(1, 28)),
+        'new_rate': None,
+        'new_rate_date': None,
+    }
+    if rng.random() < 0.5:
+        scenario['new_rate'] = rng.choice([1.0, 6.0, round(rng.uniform(0.1, 12), 2)])
+        scenario['new_rate_date'] = date(rng.randint(2018, 2070), rng.randint(1, 12), rng.randint(1, 28))
+    return scenario
+
+
+def run_accuracy(cases=500, seed=0):
+    """Compare every fast path with the reference loops; returns a list of failure messages."""
+    rng = random.Random(seed)
+    failures = []
+    scenarios = [_random_scenario(rng) for _ in range(cases)]
+    for scenario in scenarios:
+        expected, principal, interest, payment = calculate_mortgage_payments_loop(**scenario)
+        actual, fast_principal, fast_interest, fast_payment = calculate_mortgage_payments(**scenario)
+        if len(actual) != len(expected) or not (actual['Date'] == expected['Date']).all():
+            failures.append(f"schedule rows differ for {scenario}")
+            continue
+        worst = (actual.drop(columns='Date') - expected.drop(columns='Date')).abs().to_numpy().max()
+        totals = max(abs(fast_principal - principal), abs(fast_interest - interest), abs(fast_payment - payment))
+        if worst > PENNY + 1e-9 or totals > PENNY:
+            failures.append(f"schedule differs by {max(worst, totals):.4f} for {scenario}")
+        if not calculate_schedule(**scenario).to_pandas().equals(actual):
+            failures.append(f"compact schedule differs for {scenario}")
+        summary = mortgage_summary(**scenario)
+        if summary['payoff_month'] != len(expected) or abs(summary['total_interest_paid'] - interest) > PENNY or abs(summary['monthly_payment'] - payment) > PENNY:
+            failures.append(f"summary differs for {scenario}")
+
+    # The batch engine over the same scenarios, one array per argument
+    columns = {name: [scenario[name] for scenario in scenarios] for name in scenarios[0]}
+    columns['new_rate'] = [rate or 0.0 for rate in columns['new_rate']]
+    columns['start_date'] = np.array(columns['start_date'], dtype=object)
+    columns['new_rate_date'] = np.array(columns['new_rate_date'], dtype=object)
+    batch = batch_mortgage_scenarios(**columns)
+    for i, scenario in enumerate(scenarios):
+        expected, _, interest, payment = calculate_mortgage_payments_loop(**scenario)
+        if batch['payoff_month'][i] != len(expected) or abs(batch['total_interest_paid'][i] - interest) > PENNY or abs(batch['monthly_payment'][i] - payment) > PENNY:
+            failures.append(f"batch differs for {scenario}")
+
+    # The whole-pence engines: rows add up to the balance repaid, the grid and batch agree to the
+    # penny, and the scheduled payment is the float one rounded while it is never recomputed
+    for rounding in ROUNDINGS:
+        grid = pence_grid(**columns, rounding=rounding)
+        pence_batch = batch_mortgage_scenarios(**columns, rounding=rounding)
+        for i, scenario in enumerate(scenarios):
+            schedule = pence_schedule(**scenario, rounding=rounding)
+            rows = len(schedule)
+            if schedule.balance[-1] != 0 or int(schedule.principal.sum()) != round((scenario['balance'] - scenario['lump_sum']) * 100):
+                failures.append(f"pence schedule ({rounding}) does not reconcile for {scenario}")
+            if grid['last_month'][i] != rows - 1 or not all(np.array_equal(grid[name][i, :rows], getattr(schedule, name)) for name in ('principal', 'interest', 'payment', 'balance')):
+                failures.append(f"pence grid ({rounding}) differs for {scenario}")
+            if grid['monthly_payment'][i] / 100 != schedule.monthly_payment or pence_batch['monthly_payment'][i] != schedule.monthly_payment:
+                failures.append(f"pence monthly payment ({rounding}) differs between engines for {scenario}")
+            if scenario['new_rate'] is None and abs(schedule.monthly_payment - batch['monthly_payment'][i]) > PENNY:
+                failures.append(f"pence monthly payment ({rounding}) is {schedule.monthly_payment} for {scenario}")
+
+    # Portfolio output across chunks that mix valid and invalid loans, for both file formats
+    loans = pd.DataFrame({'balance': [5000, 5000, 250000, 100000, 200000, 5000], 'interest_rate': 3.5, 'years_left': 25, 'lump_sum': 10000})
+    with tempfile.TemporaryDirectory() as folder:
+        loans.to_csv(os.path.join(folder, 'loans.csv'), index=False)
+        for extension in ('csv', 'parquet'):
+            for rounding in (None, *ROUNDINGS):
+                path = os.path.join(folder, f'summaries.{extension}')
+                try:
+                    run_portfolio(os.path.join(folder, 'loans.csv'), path, os.path.join(folder, f'schedules.{extension}'), chunk_size=2, processes=1, progress=None, rounding=rounding)
+                except Exception as error:
+                    failures.append(f"portfolio ({extension}, {rounding}) failed: {error!r}")
+                    continue
+                summary = pd.read_csv(path) if extension == 'csv' else pd.read_parquet(path)
+                if summary['error'].notna().tolist() != (loans['balance'] <= loans['lump_sum']).tolist() or summary['end_date'].isna().tolist() != summary['error'].notna().tolist():
+                    failures.append(f"portfolio ({extension}, {rounding}) summaries are wrong")
+
+    for _ in range(cases // 5):
+        args = (rng.uniform(0, 1e5), rng.choice([0.0, round(rng.uniform(0, 12), 2)]), round(rng.uniform(0, 5), 2), rng.randint(1, 50), rng.random() < 0.5)
+        principal, annual_rate, inflation_rate, years, include_inflation = args
+        expected = compound_interest_reference(principal, annual_rate, inflation_rate, years, include_inflation)
+        actual = savings_projection(principal, annual_rate, years, inflation_rate, include_inflation)
+        if (actual - expected).abs().to_numpy().max() > PENNY:
+            failures.append(f"savings projection differs for {args}")
+    return failures
+
+
+def compare(results, baseline, max_slowdown):
+    """Metrics slower than ``max_slowdown`` times their baseline, as (name, baseline, current)."""
+    return [(name, baseline[name], seconds) for name, seconds in results.items() if name in baseline and seconds > baseline[name] * max_slowdown]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Mortgage Buddy calculation engines.")
+    parser.add_argument('--output', help="Write timings to this JSON file")
+    parser.add_argument('--baseline', help="JSON file from an earlier run to compare against")
+    parser.add_argument('--max-slowdown', type=float, default=1.25, help="Allowed ratio to the baseline before failing")
+    parser.add_argument('--cases', type=int, default=500, help="Random scenarios for the accuracy check")
+    parser.add_argument('--quick', action='store_true', help="Fewer repeats and a smaller batch")
+    args = parser.parse_args(argv)
+
+    failures = run_accuracy(args.cases)
+    for failure in failures:
+        print(f"ACCURACY {failure}", file=sys.stderr)
+
+    results = run_timings(args.quick)
+    for name, seconds in results.items():
+        print(f"{name:28s} {seconds * 1e3:10.4f} ms")
+    report = {'python': platform.python_version(), 'numpy': np.__version__, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    slower = []
+    if args.baseline:
+        with open(args.baseline) as handle:
+            slower = compare(results, json.load(handle)['results'], args.max_slowdown)
+        for name, before, after in slower:
+            print(f"SLOWER {name}: {before * 1e3:.4f} ms -> {after * 1e3:.4f} ms ({after / before:.2f}x)", file=sys.stderr)
+    return 1 if failures or slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
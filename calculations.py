@@ -1,7 +1,445 @@
+import math
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
 
-def calculate_mortgage_payments(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None):
+
+def _start_month(start_date):
+    # Schedules are labelled by calendar month; the day only matters for when a new rate kicks in
+    if start_date is None:
+        return date.today()
+    return start_date
+
+
+def _switch_index(start, new_rate_date):
+    # First month of the schedule whose date (same day-of-month as start) is on or after new_rate_date
+    index = (new_rate_date.year - start.year) * 12 + (new_rate_date.month - start.month)
+    if new_rate_date.day > start.day:
+        index += 1
+    return max(index, 0)
+
+
+def _fixed_segment(balance, monthly_rate, payment, months):
+    # Opening balances of an annuity paying a fixed amount each month: b * g^k - payment * (g^k - 1) / r
+    if monthly_rate == 0:
+        return balance - payment * months
+    growth = np.expm1(months * np.log1p(monthly_rate))
+    return balance * (growth + 1) - payment * growth / monthly_rate
+
+
+def _reamortized_segment(balance, monthly_rate, remaining_months, additional_repayment, months):
+    # Opening balances and payments when the payment is recomputed every month over the months left.
+    # With w(m) = 1 - (1 + r)^-m the recurrence b' = b * w(m - 1) / w(m) - extra telescopes on b / w(m),
+    # so balances follow from a cumulative sum instead of a month-by-month loop.
+    left = remaining_months - months
+    if monthly_rate == 0:
+        weight = left.astype(float)
+        scale = 1.0
+    else:
+        weight = -np.expm1(-left * np.log1p(monthly_rate))
+        scale = monthly_rate
+    scaled = np.empty(len(months))
+    scaled[0] = balance / weight[0]
+    scaled[1:] = -additional_repayment / weight[1:]
+    scaled = np.cumsum(scaled)
+    return scaled * weight, scaled * scale
+
+
+def _rate_segments(start, num_payments, monthly_rate, new_rate=None, new_rate_date=None, rate_path=None):
+    # (first month, end month, monthly rate, payment recomputed monthly) for each stretch at one rate.
+    # A single new_rate/new_rate_date switch is a one-entry rate path.
+    if rate_path is None:
+        rate_path = [(new_rate_date, new_rate)] if new_rate and new_rate_date else []
+    switches = {}
+    for effective_date, rate in sorted(rate_path, key=lambda entry: entry[0]):
+        switches[min(_switch_index(start, effective_date), num_payments)] = rate / 100 / 12
+    segments = []
+    first, rate, reamortized = 0, monthly_rate, False
+    for switch in sorted(switches):
+        if switch >= num_payments:
+            break
+        segments.append((first, switch, rate, reamortized))
+        first, rate, reamortized = switch, switches[switch], True
+    segments.append((first, num_payments, rate, reamortized))
+    return [segment for segment in segments if segment[0] < segment[1]]
+
+
+def _amortize_segment(balance, segment, num_payments, monthly_payment, additional_repayment):
+    # Columns for one rate segment, cut short if the mortgage is paid off within it
+    first, last, rate, reamortized = segment
+    months = np.arange(last - first)
+    if reamortized:
+        opening, payment = _reamortized_segment(balance, rate, num_payments - first, additional_repayment, months)
+        payment = payment + additional_repayment
+    else:
+        opening = _fixed_segment(balance, rate, monthly_payment + additional_repayment, months)
+        payment = np.full(len(months), monthly_payment + additional_repayment)
+    interest = opening * rate
+    principal = payment - interest
+    closing = opening - principal
+
+    paid_off = np.flatnonzero(closing <= 0)
+    if len(paid_off):
+        end = paid_off[0] + 1
+        interest, payment, principal, closing = interest[:end], payment[:end], principal[:end].copy(), closing[:end].copy()
+        principal[-1] += closing[-1]  # Adjust the principal payment to not exceed the remaining balance
+        closing[-1] = 0
+    return {'principal': principal, 'interest': interest, 'payment': payment, 'balance': closing}
+
+
+def _join_segments(parts, start):
+    schedule = {name: np.concatenate([part[name] for part in parts]) for name in ('principal', 'interest', 'payment', 'balance')}
+    schedule['month'] = np.arange(len(schedule['balance']))
+    schedule['start'] = start
+    schedule['monthly_payment'] = schedule['payment'][-1]
+    return schedule
+
+
+def _initial_terms(interest_rate, years_left, balance, lump_sum):
+    monthly_rate = interest_rate / 100 / 12
+    num_payments = int(years_left * 12)
+
+    if lump_sum > 0:
+        balance -= lump_sum
+
+    if balance <= 0:
+        raise ValueError("Lump sum payment exceeds mortgage balance.")
+
+    if monthly_rate != 0:
+        monthly_payment = balance * (monthly_rate * (1 + monthly_rate) ** num_payments) / ((1 + monthly_rate) ** num_payments - 1)
+    else:
+        monthly_payment = balance / num_payments
+    return monthly_rate, num_payments, balance, monthly_payment
+
+
+def amortization_schedule(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None):
+    """Compute a repayment schedule as NumPy columns.
+
+    ``rate_path`` is an optional list of (effective date, rate %) pairs and takes the place of
+    new_rate/new_rate_date. After the first change the payment is recomputed every month over
+    the months left, as with a single new rate.
+
+    Returns a dict with the month index (0 = first payment), the unrounded principal, interest,
+    total payment and remaining balance per month, the start date the month index is relative to
+    and the monthly payment in force at the end of the schedule.
+    """
+    monthly_rate, num_payments, balance, monthly_payment = _initial_terms(interest_rate, years_left, balance, lump_sum)
+    start = _start_month(start_date)
+
+    parts = []
+    remaining_balance = balance
+    for segment in _rate_segments(start, num_payments, monthly_rate, new_rate, new_rate_date, rate_path):
+        parts.append(_amortize_segment(remaining_balance, segment, num_payments, monthly_payment, additional_repayment))
+        remaining_balance = parts[-1]['balance'][-1]
+        if remaining_balance <= 0:
+            break
+    return _join_segments(parts, start)
+
+
+class RatePathSchedule:
+    """Schedule over an editable rate path that only recomputes months after the first edit.
+
+    The balance at each segment boundary is kept, so changing a later rate or date replays the
+    schedule from that boundary instead of from the first month.
+    """
+
+    def __init__(self, interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None):
+        self.monthly_rate, self.num_payments, self.balance, self.monthly_payment = _initial_terms(interest_rate, years_left, balance, lump_sum)
+        self.additional_repayment = additional_repayment
+        self.start = _start_month(start_date)
+        self.segments = []
+        self.parts = []
+
+    def update(self, rate_path):
+        """Return the schedule for ``rate_path`` in the format of amortization_schedule."""
+        segments = _rate_segments(self.start, self.num_payments, self.monthly_rate, rate_path=rate_path)
+        kept = 0
+        while kept < min(len(segments), len(self.parts)) and segments[kept] == self.segments[kept]:
+            kept += 1
+        parts = self.parts[:kept]
+        remaining_balance = parts[-1]['balance'][-1] if parts else self.balance
+        for segment in segments[kept:]:
+            if remaining_balance <= 0:
+                break
+            parts.append(_amortize_segment(remaining_balance, segment, self.num_payments, self.monthly_payment, self.additional_repayment))
+            remaining_balance = parts[-1]['balance'][-1]
+        self.segments, self.parts = segments[:len(parts)], parts
+        return _join_segments(parts, self.start)
+
+
+@lru_cache(maxsize=None)
+def _label_table(first_year, last_year):
+    # Every '%Y-%m' label between two years, so schedules can pick theirs out by month ordinal
+    return np.array([f"{year:04d}-{month:02d}" for year in range(first_year, last_year + 1) for month in range(1, 13)], dtype=object)
+
+
+def calendar_periods(start, months, months_per_period):
+    """Where each calendar year (12), quarter (3) or month (1) begins in the increasing month
+    offsets ``months`` from ``start``, and its label ('2027', '2027-Q1' or '2027-01')."""
+    period = (start.year * 12 + start.month - 1 + np.asarray(months)) // months_per_period
+    first = np.flatnonzero(np.diff(period, prepend=-1))
+    period = period[first] * months_per_period
+    if months_per_period == 12:
+        labels = [str(year) for year in period // 12]
+    elif months_per_period == 3:
+        labels = [f"{year}-Q{quarter}" for year, quarter in zip(period // 12, period % 12 // 3 + 1)]
+    else:
+        labels = month_labels(start, np.asarray(months)[first])
+    return first, labels
+
+
+def month_labels(start, months):
+    """Format month offsets from ``start`` as the ``'%Y-%m'`` strings used in schedule tables."""
+    months = np.asarray(months)
+    first_year = start.year - start.year % 100
+    last_year = start.year + (start.month - 1 + int(months.max(initial=0))) // 12
+    table = _label_table(first_year, max(last_year, first_year + 99))
+    return table[(start.year - first_year) * 12 + start.month - 1 + months]
+
+
+def schedule_frame(schedule):
+    """Build the schedule table shown in the app from amortization_schedule columns."""
+    return pd.DataFrame({
+        'Date': month_labels(schedule['start'], schedule['month']),
+        'Principal Payment': np.round(schedule['principal'], 2),
+        'Interest Payment': np.round(schedule['interest'], 2),
+        'Total Payment': np.round(schedule['payment'], 2),
+        'Remaining Balance': np.round(schedule['balance'], 2),
+    })
+
+
+def _read_only(values):
+    values.flags.writeable = False
+    return values
+
+
+class Schedule:
+    """Compact repayment schedule: month offsets from ``start`` and money columns in int64 pence.
+
+    Holds the penny-rounded values of schedule_frame (or the exact rows of pence_schedule)
+    without a label string per row, and with totals as plain attributes. The arrays are
+    read-only, so one Schedule can be shared between sessions. ``to_arrow`` hands the table to
+    st.dataframe without going through pandas; ``to_pandas`` gives the schedule_frame table.
+    """
+    __slots__ = ('start', 'month', 'principal', 'interest', 'payment', 'balance', 'total_principal_paid', 'total_interest_paid', 'monthly_payment')
+    COLUMNS = {'Principal Payment': 'principal', 'Interest Payment': 'interest', 'Total Payment': 'payment', 'Remaining Balance': 'balance'}
+
+    def __init__(self, schedule):
+        """Build from amortization_schedule columns."""
+        self.start = schedule['start']
+        self.month = _read_only(schedule['month'].astype(np.int32))
+        for name in self.COLUMNS.values():
+            setattr(self, name, _read_only(np.rint(schedule[name] * 100).astype(np.int64)))
+        self.total_principal_paid = float(schedule['principal'].sum())
+        self.total_interest_paid = float(schedule['interest'].sum())
+        self.monthly_payment = float(schedule['monthly_payment'])
+
+    @classmethod
+    def from_pence(cls, start, principal, interest, payment, balance, monthly_payment):
+        """Build from whole-pence columns and the scheduled payment in force at the end (in
+        pence, which the final, balancing row may differ from); the totals are exact sums."""
+        schedule = cls.__new__(cls)
+        schedule.start = start
+        schedule.month = _read_only(np.arange(len(balance), dtype=np.int32))
+        for name, values in zip(('principal', 'interest', 'payment', 'balance'), (principal, interest, payment, balance)):
+            setattr(schedule, name, _read_only(np.asarray(values, dtype=np.int64)))
+        schedule.total_principal_paid = int(schedule.principal.sum()) / 100
+        schedule.total_interest_paid = int(schedule.interest.sum()) / 100
+        schedule.monthly_payment = int(monthly_payment) / 100
+        return schedule
+
+    def __len__(self):
+        return len(self.month)
+
+    @property
+    def nbytes(self):
+        return self.month.nbytes + sum(getattr(self, name).nbytes for name in self.COLUMNS.values())
+
+    def labels(self):
+        return month_labels(self.start, self.month)
+
+    def column(self, name):
+        """A money column in pounds, e.g. ``column('Remaining Balance')``."""
+        return getattr(self, self.COLUMNS[name]) / 100
+
+    def to_arrow(self, first=0, stop=None):
+        """Rows ``first`` to ``stop`` of the schedule table as a pyarrow Table.
+
+        Dates are dictionary-encoded, with the month offsets as indices; a full table uses them
+        without copying.
+        """
+        import pyarrow as pa
+        rows = slice(first, stop)
+        month = self.month[rows]
+        offset = int(month[0]) if len(month) else 0
+        dictionary = pa.array(month_labels(self.start, np.arange(offset, offset + len(month))), pa.string())
+        columns = {'Date': pa.DictionaryArray.from_arrays(pa.array(month - offset if offset else month), dictionary)}
+        columns.update((name, pa.array(getattr(self, attribute)[rows] / 100)) for name, attribute in self.COLUMNS.items())
+        return pa.table(columns)
+
+    def aggregate(self, months_per_period):
+        """Payments summed per calendar year (12) or quarter (3), with the balance at the end of
+        each period, as a DataFrame indexed by period label. Sums are exact in pence.
+        """
+        first, labels = calendar_periods(self.start, self.month, months_per_period)
+        data = {name: np.add.reduceat(getattr(self, attribute), first) / 100 for name, attribute in self.COLUMNS.items() if attribute != 'balance'}
+        data['Remaining Balance'] = self.balance[np.append(first[1:], len(self)) - 1] / 100
+        return pd.DataFrame(data, index=pd.Index(labels, name='Date'))
+
+    def to_pandas(self):
+        """The schedule_frame table."""
+        return pd.DataFrame({'Date': self.labels(), **{name: self.column(name) for name in self.COLUMNS}})
+
+
+ROUNDINGS = ('half_even', 'truncate')
+# Annual rates are held as whole 1/10,000ths of a percent; a month's interest in pence is
+# balance * scaled rate / _RATE_DENOMINATOR, which stays within int64 for balances up to £10bn at 40%
+RATE_SCALE = 10000
+_RATE_DENOMINATOR = 12 * 100 * RATE_SCALE
+
+
+def _check_rounding(rounding):
+    if rounding not in ROUNDINGS:
+        raise ValueError(f"Unknown rounding {rounding!r}; expected one of {', '.join(ROUNDINGS)}.")
+
+
+def _divide(numerator, denominator, rounding):
+    # Integer division of int64 arrays rounded half-to-even or truncated. While the quotient is
+    # below 2^28 a float division is never close enough to a tie or a whole number to round the
+    # wrong way, so the slower integer route is only taken for larger numbers.
+    if np.abs(numerator).max(initial=0) < denominator << 28:
+        quotient = numerator / denominator
+        return (np.rint(quotient) if rounding == 'half_even' else np.floor(quotient)).astype(np.int64)
+    quotient, remainder = np.divmod(numerator, denominator)
+    if rounding == 'truncate':
+        return quotient
+    twice = 2 * remainder
+    return quotient + ((twice > denominator) | ((twice == denominator) & (quotient % 2 == 1)))
+
+
+def _pence(amount, rounding):
+    # Pounds to whole pence; the tolerance keeps 1122.61 * 100 = 112260.99999... from truncating a penny short
+    pence = np.asarray(amount) * 100
+    return (np.rint(pence) if rounding == 'half_even' else np.floor(pence + 1e-6)).astype(np.int64)
+
+
+def _fixed_pence(opening, rate, scaled_rate, payment, extra, months, rounding):
+    # Principal and interest in pence at a fixed payment, cut short at payoff. Each month's interest
+    # depends on the rounded balance before it, so the balances are found by iteration from the float
+    # schedule: a pass works out every month from the current guess with one cumulative sum, and the
+    # months up to the first balance it changes are then exact. The guess is only out by the odd
+    # rounding flip, so a few passes settle the whole segment.
+    # Truncated interest averages half a penny less, so the guess pays half a penny more
+    bias = 0.5 if rounding == 'truncate' else 0.0
+    guess = _pence(_fixed_segment(opening / 100, rate, (payment + extra + bias) / 100, np.arange(months)), 'half_even')
+    guess[0] = opening
+    interest = np.empty(months, dtype=np.int64)
+    principal = np.empty(months, dtype=np.int64)
+    exact = 0  # Opening balances before this month are settled
+    while True:
+        interest[exact:] = _divide(guess[exact:] * scaled_rate, _RATE_DENOMINATOR, rounding)
+        principal[exact:] = payment + extra - interest[exact:]
+        paid_off = np.flatnonzero(principal[exact:] >= guess[exact:])
+        end = exact + paid_off[0] + 1 if len(paid_off) else months
+        balance = guess[exact] - np.cumsum(principal[exact:-1])
+        changed = np.flatnonzero(balance[:end - exact - 1] != guess[exact + 1:end])
+        if not len(changed):
+            break
+        guess[exact + 1:] = balance
+        exact += changed[0] + 1
+    if len(paid_off):
+        principal[end - 1] = guess[end - 1]
+    return principal[:end], interest[:end]
+
+
+def _reamortized_pence(opening, annuity, scaled_rate, extra, rounding):
+    # Principal and interest in pence with the payment reset from the balance every month, cut short
+    # at payoff; also returns the last payment set. A rounding flip in one payment moves every later
+    # one, so iterating as _fixed_pence does takes many passes; stepping the months in turn is quicker.
+    principal, interest = [], []
+    remaining = opening
+    for weight in annuity.tolist():
+        payment = remaining / 100 * weight * 100
+        payment = round(payment) if rounding == 'half_even' else math.floor(payment + 1e-6)
+        month_interest, remainder = divmod(remaining * scaled_rate, _RATE_DENOMINATOR)
+        if rounding == 'half_even' and (2 * remainder > _RATE_DENOMINATOR or (2 * remainder == _RATE_DENOMINATOR and month_interest % 2)):
+            month_interest += 1
+        month_principal = min(payment + extra - month_interest, remaining)
+        remaining -= month_principal
+        principal.append(month_principal)
+        interest.append(month_interest)
+        if remaining == 0:
+            break
+    return np.array(principal, dtype=np.int64), np.array(interest, dtype=np.int64), payment
+
+
+def _pence_segment(opening, segment, num_payments, payment, extra, rounding):
+    # One rate segment in whole pence, cut short at payoff; the final month of the term clears the balance
+    first, last, rate, reamortized = segment
+    scaled_rate = round(rate * 1200 * RATE_SCALE)
+    if reamortized:
+        annuity = (rate or 1.0) / _annuity_weight(rate, num_payments - first - np.arange(last - first))
+        principal, interest, payment = _reamortized_pence(opening, annuity, scaled_rate, extra, rounding)
+    else:
+        principal, interest = _fixed_pence(opening, rate, scaled_rate, payment, extra, last - first, rounding)
+    balance = opening - np.cumsum(principal)
+    if last == num_payments and len(principal) == last - first:
+        principal[-1] += balance[-1]
+        balance[-1] = 0
+    return {'principal': principal, 'interest': interest, 'payment': principal + interest, 'balance': balance, 'monthly_payment': payment + extra}
+
+
+def pence_schedule(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None, rounding='half_even'):
+    """amortization_schedule worked in whole pence the way a lender's statement is.
+
+    Each month's interest is the balance times the rate (to four decimal places of a percent)
+    rounded to the penny by ``rounding``: 'half_even' or 'truncate'. The contractual payment is
+    rounded the same way when it is set, which after a rate change is every month. The last
+    payment clears the balance, so the rows add up to the totals exactly. Returns a Schedule.
+    """
+    _check_rounding(rounding)
+    monthly_rate, num_payments, balance, _ = _initial_terms(interest_rate, years_left, balance, lump_sum)
+    start = _start_month(start_date)
+    payment = int(_pence(balance * (monthly_rate or 1.0) / _annuity_weight(monthly_rate, num_payments), rounding))
+    extra = int(_pence(additional_repayment, 'half_even'))
+
+    parts = []
+    remaining = int(_pence(balance, 'half_even'))
+    for segment in _rate_segments(start, num_payments, monthly_rate, new_rate, new_rate_date, rate_path):
+        parts.append(_pence_segment(remaining, segment, num_payments, payment, extra, rounding))
+        remaining = int(parts[-1]['balance'][-1])
+        if remaining == 0:
+            break
+    columns = (np.concatenate([part[name] for part in parts]) for name in ('principal', 'interest', 'payment', 'balance'))
+    return Schedule.from_pence(start, *columns, parts[-1]['monthly_payment'])
+
+
+def calculate_schedule(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None, rounding=None):
+    """calculate_mortgage_payments as a compact Schedule."""
+    if rounding is not None:
+        return pence_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path, rounding)
+    return Schedule(amortization_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path))
+
+
+def calculate_mortgage_payments(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None, rounding=None):
+    """The schedule table, total principal and interest paid and the final monthly payment.
+
+    With ``rounding`` ('half_even' or 'truncate') the schedule is worked in whole pence by
+    pence_schedule and the rows add up to the totals exactly.
+    """
+    if rounding is not None:
+        schedule = pence_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path, rounding)
+        return schedule.to_pandas(), schedule.total_principal_paid, schedule.total_interest_paid, schedule.monthly_payment
+    schedule = amortization_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path)
+    frame = schedule_frame(schedule)
+    total_principal_paid = float(schedule['principal'].sum())
+    total_interest_paid = float(schedule['interest'].sum())
+    return frame, total_principal_paid, total_interest_paid, float(schedule['monthly_payment'])
+
+
+def calculate_mortgage_payments_loop(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None):
+    # Reference month-by-month implementation, kept to check the array engine against
     monthly_rate = interest_rate / 100 / 12  # Monthly interest rate
     num_payments = years_left * 12  # Total number of payments (months)
 
@@ -70,3 +508,239 @@ def calculate_mortgage_payments(interest_rate, years_left, balance, additional_r
         current_date = current_date.replace(month=next_month)
 
     return pd.DataFrame(schedule), total_principal_paid, total_interest_paid, total_monthly_payment
+
+
+def _switch_indices(start_date, new_rate, new_rate_date, num_payments):
+    # Per-scenario month at which the new rate applies; num_payments where there is no rate change
+    new_rate = np.broadcast_to(np.nan_to_num(np.asarray(new_rate, dtype=float)), num_payments.shape)
+    dates = pd.DatetimeIndex(pd.to_datetime(np.broadcast_to(np.asarray(new_rate_date, dtype=object), num_payments.shape).ravel()))
+    starts = pd.DatetimeIndex(pd.to_datetime(np.broadcast_to(np.asarray(start_date, dtype=object), num_payments.shape).ravel()))
+    index = (dates.year - starts.year) * 12 + (dates.month - starts.month) + (dates.day > starts.day)
+    index = np.maximum(np.asarray(index, dtype=float).reshape(num_payments.shape), 0)
+    has_switch = (new_rate != 0) & ~np.isnan(index)
+    return np.where(has_switch, np.minimum(np.nan_to_num(index), num_payments), num_payments).astype(np.int64)
+
+
+def _annuity_weight(monthly_rate, months):
+    # 1 - (1 + r)^-m, or m itself when the rate is zero, so that payment = balance * scale / weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = -np.expm1(-months * np.log1p(monthly_rate))
+    return np.where(monthly_rate == 0, months, weight)
+
+
+def scenario_grid(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None):
+    """Evaluate many repayment scenarios month by month as 2-D arrays (scenario x month).
+
+    Every argument broadcasts against the others. Returns a dict with the opening balance,
+    interest, principal, total payment and closing balance per month (zero after payoff), the
+    index of the final payment per scenario and the balance left after the lump sum.
+    """
+    rate = np.asarray(interest_rate, dtype=float) / 100 / 12
+    num_payments = np.asarray(years_left, dtype=float) * 12
+    balance = np.asarray(balance, dtype=float) - np.maximum(np.asarray(lump_sum, dtype=float), 0)
+    extra = np.asarray(additional_repayment, dtype=float)
+    new_rate = np.asarray(0.0 if new_rate is None else new_rate, dtype=float)
+    rate, num_payments, balance, extra, new_rate = np.broadcast_arrays(rate, num_payments.astype(np.int64), balance, extra, new_rate)
+
+    if np.any(balance <= 0):
+        raise ValueError("Lump sum payment exceeds mortgage balance.")
+
+    start = _start_month(start_date) if np.ndim(start_date) == 0 else start_date
+    switch = _switch_indices(start, new_rate, new_rate_date, num_payments)
+    rate, num_payments, balance, extra, switch = (np.atleast_1d(a).ravel() for a in (rate, num_payments, balance, extra, switch))
+    new_rate = np.atleast_1d(np.nan_to_num(new_rate)).ravel() / 100 / 12
+
+    def col(values):
+        return values[:, None]
+
+    months = np.arange(int(num_payments.max()))[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(rate == 0, balance / num_payments, balance * rate / _annuity_weight(rate, num_payments))
+        growth = np.expm1(months * np.log1p(col(rate)))
+        fixed = col(balance) * (growth + 1) - col(payment + extra) * np.where(col(rate) == 0, months, growth / col(rate))
+
+        # After the switch the payment is recomputed every month; see _reamortized_segment
+        left = col(num_payments) - months
+        weight = np.where(left > 0, _annuity_weight(col(new_rate), left), np.inf)
+        steps = np.cumsum(1 / weight, axis=1)
+        at_switch = np.minimum(switch, months.shape[1] - 1)[:, None]
+        scaled = np.take_along_axis(fixed, at_switch, axis=1) / np.take_along_axis(weight, at_switch, axis=1)
+        scaled = scaled - col(extra) * (steps - np.take_along_axis(steps, at_switch, axis=1))
+        reamortized = months >= col(switch)
+        opening = np.where(reamortized, scaled * weight, fixed)
+        monthly = np.where(reamortized, scaled * np.where(col(new_rate) == 0, 1, col(new_rate)), col(payment)) + col(extra)
+    interest = opening * np.where(reamortized, col(new_rate), col(rate))
+    principal = monthly - interest
+    closing = opening - principal
+
+    last = np.argmax((closing <= 0) | (months >= col(num_payments) - 1), axis=1)
+    live = months <= col(last)
+    rows = np.arange(len(last))
+    final = np.maximum(closing[rows, last], 0)
+    principal[rows, last] += np.minimum(closing[rows, last], 0)
+    closing[rows, last] = final
+    for column in (opening, interest, principal, monthly, closing):
+        column[~live] = 0
+    return {
+        'opening': opening,
+        'interest': interest,
+        'principal': principal,
+        'payment': monthly,
+        'balance': closing,
+        'last_month': last,
+        'start_balance': balance,
+    }
+
+
+def pence_grid(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rounding='half_even'):
+    """pence_schedule for many scenarios at once, as scenario_grid's arrays in int64 pence,
+    plus the scheduled payment in force at the end of each scenario (``monthly_payment``).
+
+    Rounding makes every month depend on the one before, so the months are stepped in turn
+    with all the scenarios advanced together. Each scenario matches pence_schedule exactly.
+    """
+    _check_rounding(rounding)
+    rate = np.asarray(interest_rate, dtype=float)
+    num_payments = np.asarray(years_left, dtype=float) * 12
+    balance = np.asarray(balance, dtype=float) - np.maximum(np.asarray(lump_sum, dtype=float), 0)
+    extra = np.asarray(additional_repayment, dtype=float)
+    new_rate = np.asarray(0.0 if new_rate is None else new_rate, dtype=float)
+    rate, num_payments, balance, extra, new_rate = np.broadcast_arrays(rate, num_payments.astype(np.int64), balance, extra, new_rate)
+
+    if np.any(balance <= 0):
+        raise ValueError("Lump sum payment exceeds mortgage balance.")
+
+    start = _start_month(start_date) if np.ndim(start_date) == 0 else start_date
+    switch = _switch_indices(start, new_rate, new_rate_date, num_payments)
+    rate, num_payments, balance, extra, switch, new_rate = (np.atleast_1d(a).ravel() for a in (rate, num_payments, balance, extra, switch, new_rate))
+    rate, new_rate = rate / 100 / 12, np.nan_to_num(new_rate) / 100 / 12
+    scaled_rate, new_scaled_rate = (np.rint(r * 1200 * RATE_SCALE).astype(np.int64) for r in (rate, new_rate))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = _pence(balance * np.where(rate == 0, 1.0, rate) / _annuity_weight(rate, num_payments), rounding)
+    remaining = _pence(balance, 'half_even')
+    extra = _pence(extra, 'half_even')
+    start_balance = remaining
+    # Filled a month (row) at a time, then handed out transposed to scenario x month
+    grid = {name: np.zeros((int(num_payments.max()), len(remaining)), dtype=np.int64) for name in ('opening', 'interest', 'principal', 'payment', 'balance')}
+    last = np.zeros(len(remaining), dtype=np.int64)
+    scheduled = np.zeros(len(remaining), dtype=np.int64)
+    annuity_rate = np.where(new_rate == 0, 1.0, new_rate)
+    for month in range(len(grid['balance'])):
+        active = (remaining > 0) & (month < num_payments)
+        if not active.any():
+            break
+        after = month >= switch
+        recompute = after & active
+        if recompute.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                repaid = remaining / 100 * (annuity_rate / _annuity_weight(new_rate, num_payments - month))
+            payment = np.where(recompute, _pence(np.where(recompute, repaid, 0.0), rounding), payment)
+        interest = _divide(remaining * np.where(after, new_scaled_rate, scaled_rate), _RATE_DENOMINATOR, rounding)
+        principal = payment + extra - interest
+        principal = np.where((principal >= remaining) | (month == num_payments - 1), remaining, principal)
+        principal, interest = np.where(active, principal, 0), np.where(active, interest, 0)
+        grid['opening'][month] = np.where(active, remaining, 0)
+        remaining = remaining - principal
+        grid['interest'][month] = interest
+        grid['principal'][month] = principal
+        grid['payment'][month] = principal + interest
+        grid['balance'][month] = remaining
+        last[active] = month
+        scheduled = np.where(active, payment + extra, scheduled)
+    grid = {name: values.T for name, values in grid.items()}
+    grid['last_month'] = last
+    grid['monthly_payment'] = scheduled
+    grid['start_balance'] = start_balance
+    return grid
+
+
+def batch_mortgage_scenarios(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, chunk_size=4096, rounding=None):
+    """Evaluate many overpayment / lump sum / rate change scenarios in one vectorized pass.
+
+    Arguments follow ``calculate_mortgage_payments`` but each may be an array; they broadcast
+    against each other. ``new_rate_date`` entries may be None for scenarios without a rate
+    change. Returns a dict of per-scenario columns: total interest and principal paid, the
+    number of monthly payments until payoff and the monthly payment in force at the end.
+    Scenarios are processed in chunks of ``chunk_size`` to bound memory. With ``rounding``
+    they are worked in whole pence by pence_grid.
+    """
+    arrays = np.broadcast_arrays(
+        np.asarray(interest_rate, dtype=float), np.asarray(years_left), np.asarray(balance, dtype=float),
+        np.asarray(additional_repayment, dtype=float), np.asarray(lump_sum, dtype=float),
+        np.asarray(0.0 if new_rate is None else new_rate, dtype=float),
+        np.asarray(new_rate_date, dtype=object), np.asarray(_start_month(start_date) if np.ndim(start_date) == 0 else start_date, dtype=object),
+    )
+    arrays = [np.atleast_1d(a).ravel() for a in arrays]
+    results = {'total_interest_paid': [], 'total_principal_paid': [], 'payoff_month': [], 'monthly_payment': []}
+    for first in range(0, len(arrays[0]), chunk_size):
+        rate, years, bal, extra, lump, new, when, start = (a[first:first + chunk_size] for a in arrays)
+        if rounding is None:
+            grid, unit = scenario_grid(rate, years, bal, extra, lump, start, new, when), 1
+        else:
+            grid, unit = pence_grid(rate, years, bal, extra, lump, start, new, when, rounding), 100
+        rows = np.arange(len(grid['last_month']))
+        results['total_interest_paid'].append(grid['interest'].sum(axis=1) / unit)
+        results['total_principal_paid'].append((grid['start_balance'] - grid['balance'][rows, grid['last_month']]) / unit)
+        results['payoff_month'].append(grid['last_month'] + 1)
+        # The pence engine's final row only clears the balance; the scheduled payment is kept apart
+        results['monthly_payment'].append(grid['payment'][rows, grid['last_month']] if rounding is None else grid['monthly_payment'] / unit)
+    return {name: np.concatenate(parts) for name, parts in results.items()}
+
+
+def mortgage_summary(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None):
+    """Payoff date and totals of calculate_mortgage_payments without generating the schedule.
+
+    Returns a dict with payoff_month (number of payments), end_date ('%Y-%m'), the total
+    principal and interest paid and the monthly payment in force at the end.
+    """
+    monthly_rate, num_payments, balance, monthly_payment = _initial_terms(interest_rate, years_left, balance, lump_sum)
+    start = _start_month(start_date)
+
+    total_interest_paid = 0.0
+    opening = balance
+    for first, last, rate, reamortized in _rate_segments(start, num_payments, monthly_rate, new_rate, new_rate_date, rate_path):
+        length = last - first
+        if reamortized and additional_repayment != 0:
+            # No closed form when the payment is recomputed every month: an array pass over the segment
+            balances, payments = _reamortized_segment(opening, rate, num_payments - first, additional_repayment, np.arange(length))
+            payments = payments + additional_repayment
+            closings = balances * (1 + rate) - payments
+            paid_off = np.flatnonzero(closings <= 0)
+            months = paid_off[0] + 1 if len(paid_off) else length
+            payment = float(payments[months - 1])
+            closing = float(closings[months - 1])
+            total_interest_paid += float((balances[:months] * rate).sum())
+        else:
+            if reamortized:
+                # Without an overpayment the recomputed payment stays the same for the whole segment
+                remaining_months = num_payments - first
+                if rate != 0:
+                    payment = opening * (rate * (1 + rate) ** remaining_months) / ((1 + rate) ** remaining_months - 1)
+                else:
+                    payment = opening / remaining_months
+            else:
+                payment = monthly_payment + additional_repayment
+            # Payoff month from the annuity term formula; interest is the payments less the principal repaid
+            if rate == 0:
+                term = opening / payment
+            else:
+                term = math.log(payment / (payment - rate * opening)) / math.log1p(rate)
+            months = min(max(math.ceil(term), 1), length)
+            # The closed-form term can land a hair either side of a whole month; settle it on the balances
+            if months > 1 and _fixed_segment(opening, rate, payment, months - 1) <= 0:
+                months -= 1
+            closing = _fixed_segment(opening, rate, payment, months)
+            total_interest_paid += payment * months - opening + closing
+        if closing <= 0 or first + months == num_payments:
+            break
+        opening = closing
+
+    months = first + months
+    return {
+        'payoff_month': months,
+        'end_date': month_labels(start, [months - 1])[0],
+        'total_principal_paid': float(balance - max(closing, 0)),
+        'total_interest_paid': float(total_interest_paid),
+        'monthly_payment': float(payment),
+    }
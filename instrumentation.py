@@ -0,0 +1,157 @@
+"""Opt-in per-rerun timings for the Streamlit pages.
+
+Turn it on with the MORTGAGE_BUDDY_PROFILE=1 environment variable or by adding ?profile=1 to
+the page URL. Each rerun then records the wall time of every phase, plus row counts and
+serialized (Arrow IPC) sizes of the frames handed to Streamlit. These are shown in a sidebar panel and
+appended as JSON lines to MORTGAGE_BUDDY_PROFILE_LOG (profile.jsonl by default).
+
+    python instrumentation.py profile.jsonl
+
+prints p50/p99 per page and phase from such a log.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import startup
+
+PROFILE_ENV = 'MORTGAGE_BUDDY_PROFILE'
+LOG_ENV = 'MORTGAGE_BUDDY_PROFILE_LOG'
+DEFAULT_LOG = 'profile.jsonl'
+HISTORY = 1000
+
+# Recent phase timings across all sessions of this server process, for the panel's percentiles
+_history = defaultdict(lambda: deque(maxlen=HISTORY))
+_lock = threading.Lock()
+
+
+def enabled():
+    if os.environ.get(PROFILE_ENV, '') not in ('', '0'):
+        return True
+    return st.query_params.get('profile') == '1'
+
+
+def start(page):
+    """Begin recording a rerun of ``page``; a no-op unless profiling is enabled."""
+    if enabled():
+        st.session_state['_rerun_profile'] = {'page': page, 'started': time.perf_counter(), 'phases': []}
+    else:
+        st.session_state.pop('_rerun_profile', None)
+
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as one phase of the current rerun.
+
+    Yields a record to pass to ``measure``, or None when profiling is off.
+    """
+    profile = st.session_state.get('_rerun_profile')
+    if profile is None:
+        yield None
+        return
+    record = {'phase': name}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - started
+        profile['phases'].append(record)
+
+
+def _payload_bytes(frame):
+    # Length of the Arrow IPC stream for `frame`, which is how Streamlit sends tables to the browser
+    import pyarrow as pa
+    if hasattr(frame, 'to_arrow'):
+        frame = frame.to_arrow()
+    elif not isinstance(frame, pa.Table):
+        frame = pa.Table.from_pandas(frame)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, frame.schema) as writer:
+        writer.write_table(frame)
+    return sink.getvalue().size
+
+
+def measure(record, frame):
+    # Adds the row count and serialized size of `frame` (a DataFrame, Arrow table or Schedule) to a
+    # phase record, and returns the frame
+    if record is not None:
+        record['rows'] = len(frame)
+        record['bytes'] = _payload_bytes(frame)
+    return frame
+
+
+def _percentiles(seconds):
+    import numpy as np
+    return np.percentile(seconds, [50, 99]) * 1e3
+
+
+def _write(entry):
+    with open(os.environ.get(LOG_ENV, DEFAULT_LOG), 'a') as handle:
+        handle.write(json.dumps(entry, default=str) + '\n')
+
+
+def finish():
+    """Log the current rerun and show the debug panel.
+
+    The first page run of the process also reports the cold start (see startup.first_render),
+    whether or not profiling is on; with profiling on it is logged under the page 'startup'.
+    """
+    cold_start = startup.first_render()
+    profile = st.session_state.pop('_rerun_profile', None)
+    if profile is None:
+        return
+    import pandas as pd
+    total = time.perf_counter() - profile['started']
+    phases = profile['phases'] + [{'phase': 'total', 'seconds': total}]
+    ctx = get_script_run_ctx()
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'session': ctx.session_id if ctx else None,
+        'page': profile['page'],
+        'phases': phases,
+    }
+    with _lock:
+        for record in phases:
+            _history[profile['page'], record['phase']].append(record['seconds'])
+        history = {key: list(values) for key, values in _history.items() if key[0] == profile['page']}
+        _write(entry)
+        if cold_start is not None:
+            _write({'time': entry['time'], 'session': None, 'page': 'startup', 'phases': [{'phase': name, 'seconds': seconds} for name, seconds in cold_start.items()]})
+
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption(f"This rerun: {total * 1e3:.1f} ms")
+        if startup.cold_start() is not None:
+            st.caption(f"Cold start: first render {startup.cold_start()['first_render']:.2f} s after the process started")
+        st.dataframe(pd.DataFrame(phases).assign(ms=lambda frame: frame['seconds'] * 1e3).drop(columns='seconds'), hide_index=True)
+        st.caption(f"Recent reruns of this page (last {HISTORY} per phase)")
+        st.dataframe(pd.DataFrame(
+            [(name, len(seconds), *_percentiles(seconds)) for (_, name), seconds in history.items()],
+            columns=['phase', 'count', 'p50 ms', 'p99 ms'],
+        ), hide_index=True)
+
+
+def summarize(path):
+    """p50/p99 milliseconds, with counts, per page and phase of a JSON-lines log."""
+    import pandas as pd
+    seconds = defaultdict(list)
+    with open(path) as handle:
+        for line in handle:
+            entry = json.loads(line)
+            for record in entry['phases']:
+                seconds[entry['page'], record['phase']].append(record['seconds'])
+    return pd.DataFrame(
+        [(page, name, len(values), *_percentiles(values)) for (page, name), values in sorted(seconds.items())],
+        columns=['page', 'phase', 'count', 'p50 ms', 'p99 ms'],
+    )
+
+
+if __name__ == '__main__':
+    print(summarize(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG).to_string(index=False))
@@ -0,0 +1,171 @@
+import numpy as np
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from calculations import amortization_schedule, month_labels, _start_month, _switch_index
+
+PERCENTILES = (5, 50, 95)
+CHUNK_SIZE = 10000
+# Paths drawn from each seed; chunks are made of whole blocks, so results do not depend on the chunk size
+SEED_BLOCK = 1000
+BALANCE_BINS = 2000
+
+
+def simulate_rate_paths(initial_rate, num_paths, num_months, long_run_rate=None, reversion=0.2, volatility=1.0, floor=0.0, rng=None):
+    """Monthly mortgage rates (%) from a mean-reverting (Ornstein-Uhlenbeck) model.
+
+    ``reversion`` is the annual speed at which rates are pulled towards ``long_run_rate``
+    (default: the initial rate) and ``volatility`` the annual standard deviation in percentage
+    points. Returns a (num_paths, num_months) array whose first column is ``initial_rate``.
+    """
+    rng = np.random.default_rng(rng)
+    long_run_rate = initial_rate if long_run_rate is None else long_run_rate
+    # Exact discretisation of the OU process over one month
+    decay = np.exp(-reversion / 12)
+    if reversion > 0:
+        step = volatility * np.sqrt((1 - decay ** 2) / (2 * reversion))
+    else:
+        step = volatility / np.sqrt(12)
+    # Generated month-major so each step touches contiguous memory; returned as a transposed view
+    rates = rng.standard_normal((num_months, num_paths), dtype=np.float32)
+    rates *= np.float32(step)
+    rates[0] = initial_rate - long_run_rate
+    for month in range(1, num_months):
+        rates[month] += rates[month - 1] * np.float32(decay)
+    rates += np.float32(long_run_rate)
+    if floor is not None:
+        np.maximum(rates, floor, out=rates)
+    return rates.T
+
+
+def _simulate_chunk(task):
+    # Runs one chunk of paths, given as (seed, paths) blocks; module level so it can be sent to worker processes
+    opening, num_months, additional_repayment, model, blocks = task
+    rates = np.concatenate([
+        simulate_rate_paths(num_paths=size, num_months=num_months, rng=np.random.default_rng(seed), **model).T
+        for seed, size in blocks
+    ], axis=1) / 1200
+    num_paths = rates.shape[1]
+    balance = np.full(num_paths, opening)
+    total_interest = np.zeros(num_paths)
+    payoff = np.full(num_paths, num_months - 1, dtype=np.int32)
+    balances = np.empty((num_months, num_paths), dtype=np.float32)
+    for month in range(num_months):
+        # The payment is recomputed every month over the months left, at that month's rate
+        rate = rates[month]
+        left = num_months - month
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annuity = np.where(rate == 0, 1 / left, rate / -np.expm1(-left * np.log1p(rate)))
+        interest = balance * rate
+        total_interest += interest
+        closing = balance + interest - balance * annuity - additional_repayment
+        payoff[(balance > 0) & (closing <= 0)] = month
+        balance = np.maximum(closing, 0)
+        balances[month] = balance
+    # Per-month histograms, with the smallest and largest balance in each bin, merge exactly across
+    # chunks, keeping memory independent of the path count. Bin 0 holds paths that are paid off.
+    bins = np.where(balances > 0, np.ceil(balances / opening * BALANCE_BINS), 0).astype(np.int64)
+    bins = (np.minimum(bins, BALANCE_BINS) + np.arange(num_months)[:, None] * (BALANCE_BINS + 1)).ravel()
+    shape = (num_months, BALANCE_BINS + 1)
+    histogram = np.bincount(bins, minlength=num_months * (BALANCE_BINS + 1)).reshape(shape)
+    low, high = np.full(histogram.size, np.inf, dtype=np.float32), np.full(histogram.size, -np.inf, dtype=np.float32)
+    np.minimum.at(low, bins, balances.ravel())
+    np.maximum.at(high, bins, balances.ravel())
+    return histogram, low.reshape(shape), high.reshape(shape), total_interest, payoff
+
+
+def _simulate_chunks(tasks, cancel):
+    for task in tasks:
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+        yield _simulate_chunk(task)
+
+
+def _histogram_percentiles(histogram, low, high, percentiles):
+    # Percentiles from per-month balance histograms (bin 0 = paid off), interpolated between the
+    # smallest and largest balance in the bin they fall in
+    counts = np.cumsum(histogram, axis=1)
+    total = counts[:, -1:]
+    result = {}
+    for pct in percentiles:
+        target = pct / 100 * total
+        index = np.argmax(counts >= target, axis=1)
+        rows = np.arange(len(index))
+        below = np.where(index > 0, counts[rows, np.maximum(index - 1, 0)], 0)
+        within = histogram[rows, index]
+        fraction = np.where(within > 0, (target[:, 0] - below) / np.maximum(within, 1), 0)
+        low_value, high_value = low[rows, index], high[rows, index]
+        result[pct] = np.where(index == 0, 0.0, low_value + fraction * (high_value - low_value))
+    return result
+
+
+def monte_carlo_schedule(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None,
+                         rate_change_date=None, initial_rate=None, long_run_rate=None, reversion=0.2, volatility=1.0,
+                         num_paths=10000, seed=None, chunk_size=CHUNK_SIZE, processes=None, percentiles=PERCENTILES, cancel=None):
+    """Amortize a mortgage over many random rate paths.
+
+    Until ``rate_change_date`` (default: straight away) the current rate applies as in
+    calculate_mortgage_payments; from then on the rate follows a simulate_rate_paths path
+    starting at ``initial_rate`` (default: the current rate) and the payment is recomputed
+    every month. ``processes`` > 1 spreads the chunks of paths over a process pool; setting the
+    ``cancel`` event stops an in-process run before its next chunk with CancelledError.
+
+    Returns a dict with the start month, the month labels and, per percentile, the remaining balance for each
+    month, the total interest paid and the payoff date.
+    """
+    start = _start_month(start_date)
+    num_payments = int(years_left * 12)
+    switch = 0 if rate_change_date is None else min(_switch_index(start, rate_change_date), num_payments)
+
+    # Before the rate starts moving every path follows the same deterministic schedule
+    prefix = amortization_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start)
+    months = min(switch, len(prefix['balance']))
+    prefix_interest = prefix['interest'][:months].sum()
+    opening = prefix['balance'][months - 1] if months else balance - max(lump_sum, 0)
+
+    labels = month_labels(start, np.arange(num_payments))
+    if opening <= 0 or switch >= num_payments:
+        end = len(prefix['balance'])
+        return {
+            'start': start,
+            'months': labels[:end],
+            'balance': {pct: prefix['balance'] for pct in percentiles},
+            'total_interest_paid': {pct: float(prefix['interest'].sum()) for pct in percentiles},
+            'end_date': {pct: labels[end - 1] for pct in percentiles},
+        }
+
+    model = {
+        'initial_rate': interest_rate if initial_rate is None else initial_rate,
+        'long_run_rate': long_run_rate,
+        'reversion': reversion,
+        'volatility': volatility,
+    }
+    # One seed per block of paths, so the results do not depend on the chunking
+    sizes = [min(SEED_BLOCK, num_paths - first) for first in range(0, num_paths, SEED_BLOCK)]
+    blocks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    per_chunk = max(1, chunk_size // SEED_BLOCK)
+    tasks = [(opening, num_payments - switch, additional_repayment, model, blocks[first:first + per_chunk]) for first in range(0, len(blocks), per_chunk)]
+
+    histogram, low, high, interest, payoff = 0, np.inf, -np.inf, [], []
+    if processes and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    else:
+        results = _simulate_chunks(tasks, cancel)
+    for chunk_histogram, chunk_low, chunk_high, chunk_interest, chunk_payoff in results:
+        histogram = histogram + chunk_histogram
+        low, high = np.minimum(low, chunk_low), np.maximum(high, chunk_high)
+        interest.append(chunk_interest)
+        payoff.append(chunk_payoff)
+    interest = prefix_interest + np.concatenate(interest)
+    payoff = switch + np.concatenate(payoff)
+
+    # Exact where the paths agree (e.g. no volatility), otherwise within the spread of one bin
+    bands = _histogram_percentiles(histogram, low, high, percentiles)
+    payoff_months = np.percentile(payoff, percentiles, method='inverted_cdf')
+    return {
+        'start': start,
+        'months': labels,
+        'balance': {pct: np.concatenate([prefix['balance'][:months], bands[pct]]) for pct in percentiles},
+        'total_interest_paid': dict(zip(percentiles, np.percentile(interest, percentiles).tolist())),
+        'end_date': {pct: labels[int(month)] for pct, month in zip(percentiles, payoff_months)},
+    }
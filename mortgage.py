@@ -1,12 +1,11 @@
 import streamlit as st
-from styles import add_logo
+import instrumentation
+from styles import setup_page
 from mortgage_details import display_mortgage_details
 from simulation_analysis import display_simulation_and_analysis
 
-# Set page layout to wide
-st.set_page_config(page_title="Mortgage Buddy", layout="wide")
-
-add_logo()
+# Wide layout, locale, logo and the rerun profile
+setup_page('mortgage')
 
 # Create tabs
 tab1, tab2 = st.tabs(["Mortgage Details", "Simulation and Analysis"])
@@ -18,3 +17,5 @@ with tab1:
 # Simulation and Analysis tab
 with tab2:
     display_simulation_and_analysis()
+
+instrumentation.finish()
@@ -1,50 +1,78 @@
 import streamlit as st
-import locale
+import os
 from datetime import datetime
-from calculations import calculate_mortgage_payments
-
-# Set the locale to the user's default setting (for number formatting)
-locale.setlocale(locale.LC_ALL, '')
+from instrumentation import measure, phase
+from startup import DEFAULT_BALANCE, DEFAULT_RATE, DEFAULT_YEARS, parse_number
 
 def display_mortgage_details():
     st.header("Mortgage Details")
-    interest_rate = st.number_input('Current Interest Rate (%)', min_value=0.0, value=3.5, step=0.1, help="Your current mortgage rate")
-    years_left = st.number_input('Time Left on Mortgage (years)', min_value=1, value=30, step=1)
+    interest_rate = st.number_input('Current Interest Rate (%)', min_value=0.0, value=DEFAULT_RATE, step=0.1, help="Your current mortgage rate")
+    st.session_state['interest_rate'] = interest_rate
+    years_left = st.number_input('Time Left on Mortgage (years)', min_value=1, value=DEFAULT_YEARS, step=1)
     st.session_state['years_left'] =  years_left
-    balance_input = st.text_input('Current Mortgage Balance', value='250,000')
+    balance_input = st.text_input('Current Mortgage Balance', value=f'{DEFAULT_BALANCE:,.0f}')
 
     # Optional values container
     with st.container():
         st.subheader("Optional values")
         current_value = st.text_input('Current Value of the Property (optional)')
+        ltv = None
         # Calculate LTV if current value is provided
         if current_value:
             try:
-                current_value_num = locale.atof(current_value.replace(',', ''))
-                balance = locale.atof(balance_input.replace(',', ''))
+                current_value_num = parse_number(current_value)
+                balance = parse_number(balance_input)
                 ltv = (balance / current_value_num) * 100
                 st.write(f"Loan-to-Value (LTV): **{ltv:.2f}%**")
             except ValueError:
                 st.error("Please enter a valid number for the Current Value of the Property.")
         start_date = st.date_input("Calculate from date (optional)", value=None, help="Optional date for calculations")
+        st.session_state['start_date'] = start_date
+
+        # Rank the remortgage deals open at this LTV, when a product file is available
+        if ltv is not None:
+            from remortgage import load_products, products_path
+            if os.path.exists(products_path()):
+                with st.expander("Remortgage deals"):
+                    horizon = st.number_input('Compare deals over (years)', min_value=1, max_value=int(years_left), value=min(5, int(years_left)), step=1)
+                    try:
+                        with phase('remortgage'):
+                            products = load_products()
+                            ranking = products.rank(balance, years_left, ltv, horizon)
+                        st.caption(f"Cheapest over {horizon} years of the {len(products) - products.eligible(ltv).start:,} products (out of {len(products):,}) available at this LTV.")
+                        st.dataframe(ranking, hide_index=True)
+                    except ValueError as error:
+                        st.error(str(error))
 
 
 
     if st.button('Calculate Mortgage Details'):
         try:
-            balance = locale.atof(balance_input.replace(',', ''))
+            with phase('parse'):
+                balance = parse_number(balance_input)
             if balance > 0:
-                schedule, total_principal_paid, total_interest_paid, _ = calculate_mortgage_payments(interest_rate, years_left, balance, 0, 0, start_date)
-                st.write('Monthly Mortgage Repayment Schedule:')
-                st.dataframe(schedule)
-
-                # Plot the data
-                chart_data = schedule.set_index('Date')[['Principal Payment', 'Interest Payment', 'Total Payment']]
-                st.line_chart(chart_data)
-
+                # Keep the inputs so paging through the table or changing the chart view keeps the results
+                st.session_state['details_inputs'] = (interest_rate, years_left, balance, start_date)
                 st.session_state['years_left'] = years_left  # Save the years_left value in session state
-
             else:
+                st.session_state.pop('details_inputs', None)
                 st.error("Current Mortgage Balance must be greater than 0.")
         except ValueError:
+            st.session_state.pop('details_inputs', None)
             st.error("Please enter a valid number for the Current Mortgage Balance.")
+
+    if st.session_state.get('details_inputs'):
+        from schedule_cache import cached_schedule
+        from schedule_view import VIEWS, chart_frame, schedule_table
+        interest_rate, years_left, balance, start_date = st.session_state['details_inputs']
+        with phase('schedule') as record:
+            schedule = measure(record, cached_schedule(interest_rate, years_left, balance, 0, 0, start_date))
+        st.write('Monthly Mortgage Repayment Schedule:')
+        schedule_table(schedule, key='details_page')
+
+        # Plot the data
+        view = st.radio('Chart detail', list(VIEWS), horizontal=True, key='details_chart_view')
+        with phase('chart data'):
+            chart_data = chart_frame({name: (schedule, name) for name in ('Principal Payment', 'Interest Payment', 'Total Payment')}, view)
+        with phase('st.line_chart') as record:
+            st.line_chart(measure(record, chart_data))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from calculations import scenario_grid
+
+SPLITS = np.linspace(0, 1, 21)
+BREAK_EVEN_RETURNS = np.linspace(0, 20, 2001)
+
+
+def _investment_balances(monthly_return, contributions, savings):
+    # Month-end balances of an account compounding monthly with the given deposits.
+    # Works on any leading shape: growth factors broadcast against the contribution rows.
+    months = np.arange(contributions.shape[-1])
+    growth = (1 + monthly_return)[..., None] ** months
+    return growth * (savings * (1 + monthly_return)[..., None] + np.cumsum(contributions / growth, axis=-1))
+
+
+def overpay_vs_invest(interest_rate, years_left, balance, monthly_surplus, annual_return, horizon_years=None, savings=0.0,
+                      start_date=None, new_rate=None, new_rate_date=None, splits=SPLITS):
+    """Compare splitting a monthly surplus between overpaying the mortgage and investing it.
+
+    For every split (share of the surplus overpaid) the net worth is the investment balance less
+    the remaining mortgage balance at the end of each month. Once the mortgage is paid off the
+    freed payment is invested as well. Investments compound monthly at the rate equivalent to
+    ``annual_return``, so a lump sum grows as on the Savings page. ``savings`` is an amount
+    already invested.
+
+    All splits are evaluated together from one scenario_grid call, and the break-even return
+    is found by evaluating the all-overpay and all-invest strategies over a grid of returns at
+    once. Returns a dict with the splits, the net worth per split and month, the final net worth
+    per split, the optimal split and the break-even annual return (%), i.e. the return above
+    which investing beats overpaying; NaN if one strategy wins over the whole return grid.
+    """
+    splits = np.asarray(splits, dtype=float)
+    horizon = int((horizon_years or years_left) * 12)
+    grid = scenario_grid(interest_rate, years_left, balance, splits * monthly_surplus, 0, start_date, new_rate, new_rate_date)
+    months = np.arange(horizon)
+    rows = np.arange(len(splits))
+
+    # Remaining balance over the horizon (zero past the term) and the payment freed up at payoff
+    remaining = np.zeros((len(splits), horizon))
+    span = min(horizon, grid['balance'].shape[1])
+    remaining[:, :span] = grid['balance'][:, :span]
+    freed = np.where(months[None, :] > grid['last_month'][:, None], grid['payment'][rows, grid['last_month']][:, None], 0)
+    contributions = (1 - splits[:, None]) * monthly_surplus + freed
+
+    monthly_return = (1 + annual_return / 100) ** (1 / 12) - 1
+    worth = _investment_balances(np.full(len(splits), monthly_return), contributions, savings) - remaining
+
+    # Final net worth of overpaying everything minus investing everything, over a grid of returns
+    ends = [np.argmin(splits), np.argmax(splits)]
+    returns = BREAK_EVEN_RETURNS[:, None]
+    monthly_returns = (1 + returns / 100) ** (1 / 12) - 1
+    finals = _investment_balances(monthly_returns, contributions[ends][None, :, :], savings)[..., -1] - remaining[ends, -1]
+    advantage = finals[:, 1] - finals[:, 0]
+    crossing = np.flatnonzero(np.diff(np.sign(advantage)) != 0)
+    if len(crossing):
+        i = crossing[0]
+        break_even = BREAK_EVEN_RETURNS[i] + (BREAK_EVEN_RETURNS[i + 1] - BREAK_EVEN_RETURNS[i]) * advantage[i] / (advantage[i] - advantage[i + 1])
+    else:
+        break_even = np.nan
+
+    return {
+        'splits': splits,
+        'net_worth': worth,
+        'final_net_worth': worth[:, -1],
+        'optimal_split': float(splits[np.argmax(worth[:, -1])]),
+        'break_even_return': float(break_even),
+    }
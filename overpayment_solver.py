@@ -0,0 +1,166 @@
+import math
+import numpy as np
+
+from calculations import amortization_schedule, batch_mortgage_scenarios, mortgage_summary, _start_month
+
+PENNY = 0.01
+
+
+def _annuity_factor(monthly_rate, months):
+    # Monthly payment per unit of balance repaid over `months`
+    if monthly_rate == 0:
+        return 1 / months
+    return monthly_rate / -math.expm1(-months * math.log1p(monthly_rate))
+
+
+def _round_up(amount):
+    return math.ceil(round(amount * 100, 6)) / 100
+
+
+def _settle(satisfied, amount):
+    # Nearest penny amounts around a rounded-up estimate: a penny up if it falls short, then down
+    # while a penny less still meets the target
+    if not satisfied(amount):
+        return amount + PENNY
+    while amount >= PENNY and satisfied(round(amount - PENNY, 2)):
+        amount = round(amount - PENNY, 2)
+    return amount
+
+
+def _target_months(start, end_date):
+    # Number of payments up to and including the month of end_date
+    return (end_date.year - start.year) * 12 + end_date.month - start.month + 1
+
+
+def _bisect(satisfied, upper, tolerance=PENNY):
+    # Smallest amount in [0, upper] for which the monotone condition holds, to the nearest penny
+    if satisfied(0):
+        return 0.0
+    if not satisfied(upper):
+        raise ValueError("The target cannot be reached.")
+    low, high = 0.0, upper
+    while high - low > tolerance / 2:
+        middle = (low + high) / 2
+        if satisfied(middle):
+            high = middle
+        else:
+            low = middle
+    return _settle(satisfied, _round_up(high))
+
+
+def _max_payment(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path):
+    schedule = amortization_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path)
+    return schedule['payment'].max()
+
+
+def solve_overpayment(interest_rate, years_left, balance, end_date=None, max_interest=None, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None):
+    """Smallest additional monthly repayment that pays off by ``end_date`` or keeps the total
+    interest at or below ``max_interest`` (both, if both are given).
+
+    Uses calculate_mortgage_payments semantics. A target date without a rate change is inverted
+    in closed form; everything else is a bisection on mortgage_summary. Raises ValueError if no
+    overpayment reaches the target.
+    """
+    start = _start_month(start_date)
+    num_payments = int(years_left * 12)
+    remaining = balance - max(lump_sum, 0)
+    # Twice the balance as a monthly overpayment clears it in the first month at any realistic rate
+    upper = 2 * remaining
+
+    def satisfied(additional_repayment):
+        summary = mortgage_summary(interest_rate, years_left, balance, additional_repayment, lump_sum, start, new_rate, new_rate_date, rate_path)
+        if end_date is not None and summary['payoff_month'] > _target_months(start, end_date):
+            return False
+        return max_interest is None or summary['total_interest_paid'] <= max_interest
+
+    if end_date is not None and max_interest is None and not (new_rate and new_rate_date) and not rate_path:
+        months = _target_months(start, end_date)
+        if months < 1:
+            raise ValueError("The target cannot be reached.")
+        if months >= num_payments:
+            return 0.0
+        # Paying off within n months needs the n-month annuity payment
+        rate = interest_rate / 100 / 12
+        return _settle(satisfied, _round_up(remaining * (_annuity_factor(rate, months) - _annuity_factor(rate, num_payments))))
+    return _bisect(satisfied, upper)
+
+
+def solve_lump_sum(interest_rate, years_left, balance, end_date=None, max_interest=None, monthly_budget=None, additional_repayment=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None):
+    """Smallest one-off lump sum that pays off by ``end_date``, keeps the total interest at or
+    below ``max_interest`` and/or keeps every monthly payment within ``monthly_budget``.
+
+    A monthly budget without a rate change is inverted in closed form; everything else is a
+    bisection. Raises ValueError if no lump sum smaller than the balance reaches the target.
+    """
+    start = _start_month(start_date)
+    num_payments = int(years_left * 12)
+    rate_changes = bool(new_rate and new_rate_date) or bool(rate_path)
+
+    def satisfied(lump_sum):
+        if lump_sum >= balance:
+            return False
+        if end_date is not None or max_interest is not None:
+            summary = mortgage_summary(interest_rate, years_left, balance, additional_repayment, lump_sum, start, new_rate, new_rate_date, rate_path)
+            if end_date is not None and summary['payoff_month'] > _target_months(start, end_date):
+                return False
+            if max_interest is not None and summary['total_interest_paid'] > max_interest:
+                return False
+        if monthly_budget is not None:
+            if rate_changes:
+                payment = _max_payment(interest_rate, years_left, balance, additional_repayment, lump_sum, start, new_rate, new_rate_date, rate_path)
+            else:
+                payment = (balance - lump_sum) * _annuity_factor(interest_rate / 100 / 12, num_payments) + additional_repayment
+            if payment > monthly_budget:
+                return False
+        return True
+
+    if monthly_budget is not None and end_date is None and max_interest is None and not rate_changes:
+        if monthly_budget <= additional_repayment:
+            raise ValueError("The target cannot be reached.")
+        # The payment scales with the balance left after the lump sum
+        amount = _settle(satisfied, max(_round_up(balance - (monthly_budget - additional_repayment) / _annuity_factor(interest_rate / 100 / 12, num_payments)), 0.0))
+        if not satisfied(amount):
+            raise ValueError("The target cannot be reached.")
+        return amount
+    return _bisect(satisfied, balance - PENNY)
+
+
+def solve_overpayments(interest_rate, years_left, balance, end_dates=None, max_interest=None, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, iterations=48):
+    """Vectorized solve_overpayment for many targets at once, e.g. one end date per year.
+
+    ``end_dates`` and/or ``max_interest`` are sequences of targets (or a scalar) that broadcast
+    against each other. All targets are bisected together, each step evaluating every target in
+    one batch_mortgage_scenarios call. Returns an array of monthly overpayments rounded up to
+    the penny, with NaN where a target cannot be reached.
+    """
+    start = _start_month(start_date)
+    months = np.full(1, np.inf) if end_dates is None else np.array([_target_months(start, end) for end in np.atleast_1d(end_dates)], dtype=float)
+    cap = np.full(1, np.inf) if max_interest is None else np.atleast_1d(np.asarray(max_interest, dtype=float))
+    months, cap = np.broadcast_arrays(months, cap)
+
+    def satisfied(additional_repayment):
+        result = batch_mortgage_scenarios(interest_rate, years_left, balance, additional_repayment, lump_sum, start, new_rate, new_rate_date)
+        return (result['payoff_month'] <= months) & (result['total_interest_paid'] <= cap)
+
+    upper = np.full(months.shape, 2 * (balance - max(lump_sum, 0)))
+    reachable = (months >= 1) & satisfied(upper)
+    low, high = np.zeros(months.shape), np.where(reachable, upper, 0.0)
+    done = satisfied(low) | ~reachable
+    high = np.where(done, 0.0, high)
+    for _ in range(iterations):
+        if np.all(high - low <= PENNY / 2):
+            break
+        middle = (low + high) / 2
+        ok = satisfied(middle)
+        high = np.where(ok, middle, high)
+        low = np.where(ok, low, middle)
+    amounts = np.ceil(np.round(high * 100, 6)) / 100
+    amounts = np.where(satisfied(amounts), amounts, amounts + PENNY)
+    # The bisection stops within half a penny above the threshold, so rounding up can overshoot
+    lower = np.round(amounts - PENNY, 2)
+    stepping = (lower >= 0) & satisfied(np.maximum(lower, 0))
+    while np.any(stepping):
+        amounts = np.where(stepping, lower, amounts)
+        lower = np.round(amounts - PENNY, 2)
+        stepping = stepping & (lower >= 0) & satisfied(np.maximum(lower, 0))
+    return np.where(reachable, amounts, np.nan)
@@ -1,59 +1,17 @@
 import streamlit as st
-import pandas as pd
-import locale
+import instrumentation
+from background import cancel, result, submit
+from instrumentation import measure, phase
+from startup import parse_number
+from styles import setup_page
 
-# Set the locale to the user's default setting (for number formatting)
-locale.setlocale(locale.LC_ALL, '')
+# Wide layout, locale, logo and the rerun profile
+setup_page('savings')
 
-# Set page layout to wide
-st.set_page_config(page_title="Mortgage Buddy", layout="wide")
 
-def add_logo():
-    st.markdown(
-        """
-        <style>
-            [data-testid="stSidebarNav"] {
-                background-image: url(https://raw.githubusercontent.com/Vadoid/mortgage_buddy/main/img/buddy.png);
-                background-repeat: no-repeat;
-                background-position: right;
-                padding-top: 60px;
-                background-size: 160px 150px;
-                background-position: 20px 20px;
-            }
-            [data-testid="stSidebarNav"]::before {
-                content: "";
-                margin-left: 20px;
-                margin-top: 20px;
-                font-size: 30px;
-                position: relative;
-                top: 100px;
-            }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-add_logo()
-
-def calculate_compound_interest(principal, annual_rate, inflation_rate, years):
-    data = []
-    total_balance = principal
-    for year in range(1, years + 1):
-        interest_accrued = total_balance * (annual_rate / 100)
-
-        if st.session_state.inflation_status == False:
-            inflation_adjustment = 0
-        else:
-            inflation_adjustment = total_balance * (inflation_rate / 100)
-
-        total_balance += (interest_accrued - inflation_adjustment)
-
-        data.append({
-            'Year': year,
-            'Interest Accrued': round(interest_accrued, 2),
-            'Inflation Adjustment': round(inflation_adjustment, 2),
-            'Running Balance': round(total_balance, 2)
-        })
-    return pd.DataFrame(data)
+def calculate_compound_interest(principal, annual_rate, inflation_rate, years, monthly_contribution=0.0):
+    from savings_engine import savings_projection
+    return savings_projection(principal, annual_rate, years, inflation_rate, st.session_state.inflation_status, monthly_contribution)
 
 # Initialize session state variables
 session_state_defaults = {
@@ -85,7 +43,8 @@ with col1:
     st.write("## Savings calculator")
     savings_amount_input = st.text_input("Amount of Savings", value='10,000')
     try:
-        savings_amount = locale.atof(savings_amount_input.replace(',', ''))
+        with phase('parse'):
+            savings_amount = parse_number(savings_amount_input)
     except ValueError:
         st.error("Please enter a valid number for the Amount of Savings.")
         savings_amount = 0
@@ -96,15 +55,75 @@ with col1:
     st.session_state.inflation_status = st.checkbox('Include inflation', value=False, help="If checked, the inflationary effect would be used to calculate the 'real monetary value'")
     #savings_period = st.number_input("Period of Savings (years)", min_value=1, value=st.session_state['savings_period'], step=1)
     savings_period = st.number_input("Period of Savings (years)", min_value=1, value=st.session_state['years_left'], step=1)
+    monthly_contribution = st.number_input("Monthly Contribution (optional)", min_value=0.0, value=0.0, step=50.0, help="Paid in at the end of every month")
+    return_volatility = st.number_input("Return Volatility (% per year, optional)", min_value=0.0, value=0.0, step=1.0, help="If above zero, shows percentile bands over 10,000 random return paths")
 
     if st.button("Calculate Savings"):
+        import pandas as pd
+        from savings_engine import savings_monte_carlo
         #savings_period = savingsperiod()
-        savings_data = calculate_compound_interest(savings_amount, annual_return_rate, inflation_rate, savings_period)
+        if return_volatility > 0:
+            # The random paths run on the worker pool while the projection is shown
+            band_args = (
+                savings_amount, annual_return_rate, savings_period, return_volatility, inflation_rate, 0.0,
+                st.session_state.inflation_status, monthly_contribution, 10000, 42
+            )
+            bands_job = submit('savings.bands', band_args, savings_monte_carlo, *band_args)
+        with phase('projection'):
+            savings_data = calculate_compound_interest(savings_amount, annual_return_rate, inflation_rate, savings_period, monthly_contribution)
         total_interest = savings_data['Interest Accrued'].sum()
         total_balance = savings_data['Running Balance'].iloc[-1]
         st.write(f"Total interest accrued over the period: {total_interest:,.2f}")
         st.write(f"Total balance (savings + interest - inflation adjustment) at the end of the period: {total_balance:,.2f}")
-        st.write(savings_data)
+        with phase('st.dataframe') as record:
+            st.write(measure(record, savings_data))
+
+        if return_volatility > 0:
+            with phase('monte_carlo'):
+                bands = result(bands_job, st.empty())
+            with phase('st.line_chart') as record:
+                st.line_chart(measure(record, pd.DataFrame({f'P{pct}': band for pct, band in bands.items()}, index=savings_data['Year'])))
+
+    else:
+        cancel('savings.bands')
+
+    st.write("## Overpay or invest?")
+    monthly_surplus = st.number_input("Monthly Surplus", min_value=0.0, value=500.0, step=50.0, help="Spare money each month to split between overpaying the mortgage and investing at the return rate above")
+    mortgage_balance_input = st.text_input("Current Mortgage Balance (for comparison)", value='250,000')
+
+    if st.button("Compare Overpaying and Investing"):
+        import pandas as pd
+        from overpay_vs_invest import overpay_vs_invest
+        try:
+            with phase('parse'):
+                mortgage_balance = parse_number(mortgage_balance_input)
+            if mortgage_balance > 0:
+                comparison_args = (
+                    st.session_state.get('interest_rate', 3.5), st.session_state['years_left'], mortgage_balance, monthly_surplus,
+                    annual_return_rate, savings_period, savings_amount, st.session_state.get('start_date', None)
+                )
+                with phase('overpay_vs_invest'):
+                    comparison = result(submit('savings.overpay_vs_invest', comparison_args, overpay_vs_invest, *comparison_args), st.empty())
+                optimal_split = comparison['optimal_split']
+                break_even_return = comparison['break_even_return']
+                st.write(f"Best split at **{annual_return_rate:.2f}%**: overpay **{optimal_split:.0%}** and invest **{1 - optimal_split:.0%}** of the surplus, for a net worth of **{comparison['final_net_worth'].max():,.2f}** after {savings_period} years.")
+                if pd.notna(break_even_return):
+                    st.write(f"Investing beats overpaying when returns are above **{break_even_return:.2f}%** a year.")
+
+                # Net worth (investments less the mortgage left) at the end of each year for a few splits
+                shown = [0, len(comparison['splits']) // 2, len(comparison['splits']) - 1]
+                yearly = comparison['net_worth'][shown, 11::12]
+                with phase('st.line_chart') as record:
+                    st.line_chart(measure(record, pd.DataFrame(
+                        {f"Overpay {comparison['splits'][i]:.0%}": row for i, row in zip(shown, yearly)},
+                        index=pd.Index(range(1, yearly.shape[1] + 1), name='Year')
+                    )))
+            else:
+                st.error("Current Mortgage Balance must be greater than 0.")
+        except ValueError:
+            st.error("Please enter a valid number for the Current Mortgage Balance.")
+    else:
+        cancel('savings.overpay_vs_invest')
 
 with col2:
     # st.write("## Mortgage Summary")
@@ -153,3 +172,4 @@ with col2:
         unsafe_allow_html=True
     )
 
+instrumentation.finish()
@@ -0,0 +1,232 @@
+"""Headless runner that streams a file of loans through the calculation engine.
+
+    python portfolio.py loans.csv summaries.parquet --schedules schedules.parquet --processes 8
+
+Input is CSV or Parquet with one loan per row. Required columns: balance, interest_rate and
+years_left. Optional columns: loan_id, start_date, additional_repayment, lump_sum, new_rate and
+new_rate_date. Outputs are CSV or Parquet depending on the file extension.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from calculations import ROUNDINGS, batch_mortgage_scenarios, pence_grid, scenario_grid
+
+CHUNK_SIZE = 50000
+# Loans per chunk when schedules are written: each loan adds up to a row per month, and finished
+# chunks wait in the parent to be written in order
+SCHEDULE_CHUNK_SIZE = 1024
+GRID_CHUNK_SIZE = 4096
+OPTIONAL_COLUMNS = {'additional_repayment': 0.0, 'lump_sum': 0.0, 'new_rate': 0.0}
+
+
+def read_loans(path, chunk_size=CHUNK_SIZE):
+    """Yield the loan file as DataFrames of at most ``chunk_size`` rows."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _prepare(loans, first_row):
+    loans = loans.reset_index(drop=True)
+    if 'loan_id' not in loans:
+        loans['loan_id'] = np.arange(first_row, first_row + len(loans))
+    for column, default in OPTIONAL_COLUMNS.items():
+        loans[column] = loans[column].fillna(default) if column in loans else default
+    today = pd.Timestamp(date.today())
+    loans['start_date'] = pd.to_datetime(loans['start_date']).fillna(today) if 'start_date' in loans else today
+    loans['new_rate_date'] = pd.to_datetime(loans['new_rate_date']) if 'new_rate_date' in loans else pd.NaT
+    return loans
+
+
+def _ordinals(starts, months):
+    # Months since 1970-01, as pandas Period ordinals
+    return (starts.dt.year.to_numpy() - 1970) * 12 + starts.dt.month.to_numpy() - 1 + months
+
+
+def _labels(starts, months):
+    # '%Y-%m' labels, formatting each distinct month once
+    ordinals = _ordinals(starts, months)
+    unique, inverse = np.unique(ordinals, return_inverse=True)
+    return np.asarray(pd.PeriodIndex.from_ordinals(unique, freq='M').strftime('%Y-%m'), dtype=object)[inverse]
+
+
+def _money(values, rounding):
+    # Schedule amounts in pounds; the pence engine's are exact already
+    return np.round(values, 2) if rounding is None else values / 100
+
+
+def _schedules(loans, rounding=None):
+    # Long-format monthly rows for every loan, built a grid chunk at a time
+    frames = []
+    for first in range(0, len(loans), GRID_CHUNK_SIZE):
+        part = loans.iloc[first:first + GRID_CHUNK_SIZE]
+        args = (
+            part['interest_rate'].to_numpy(float), part['years_left'].to_numpy(), part['balance'].to_numpy(float),
+            part['additional_repayment'].to_numpy(float), part['lump_sum'].to_numpy(float),
+            part['start_date'].dt.date.to_numpy(object), part['new_rate'].to_numpy(float),
+            part['new_rate_date'].to_numpy(object),
+        )
+        grid = scenario_grid(*args) if rounding is None else pence_grid(*args, rounding=rounding)
+        months = np.arange(grid['balance'].shape[1])
+        live = months[None, :] <= grid['last_month'][:, None]
+        rows, month = np.nonzero(live)
+        frames.append(pd.DataFrame({
+            'loan_id': part['loan_id'].to_numpy()[rows],
+            'month': month,
+            # A monthly Period rather than a string per row; it is still written as '%Y-%m' to CSV
+            'Date': pd.array(pd.PeriodIndex.from_ordinals(_ordinals(part['start_date'].iloc[rows].reset_index(drop=True), month), freq='M')),
+            'Principal Payment': _money(grid['principal'][live], rounding),
+            'Interest Payment': _money(grid['interest'][live], rounding),
+            'Total Payment': _money(grid['payment'][live], rounding),
+            'Remaining Balance': _money(grid['balance'][live], rounding),
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def process_chunk(loans, first_row=0, with_schedules=False, rounding=None):
+    """Per-loan summaries (and optionally full schedules) for one chunk of loans.
+
+    Loans whose lump sum clears the balance, or with no term left, get an error message and
+    empty results instead of failing the chunk. With ``rounding`` the loans are worked in whole
+    pence (see calculations.pence_schedule), so schedule rows add up to the summary totals.
+    """
+    loans = _prepare(loans, first_row)
+    valid = (loans['balance'] - loans['lump_sum'].clip(lower=0) > 0) & (loans['years_left'] >= 1)
+    summary = pd.DataFrame({
+        'loan_id': loans['loan_id'],
+        'monthly_payment': np.nan,
+        'payoff_month': pd.array([pd.NA] * len(loans), dtype='Int64'),
+        'end_date': pd.array([pd.NA] * len(loans), dtype='string'),
+        'total_principal_paid': np.nan,
+        'total_interest_paid': np.nan,
+        'error': pd.array(np.where(valid, None, 'Lump sum payment exceeds mortgage balance or no term left.'), dtype='string'),
+    })
+    good = loans[valid]
+    schedules = None
+    if len(good):
+        result = batch_mortgage_scenarios(
+            good['interest_rate'].to_numpy(float), good['years_left'].to_numpy(), good['balance'].to_numpy(float),
+            good['additional_repayment'].to_numpy(float), good['lump_sum'].to_numpy(float),
+            good['start_date'].dt.date.to_numpy(object), good['new_rate'].to_numpy(float),
+            good['new_rate_date'].to_numpy(object), chunk_size=GRID_CHUNK_SIZE, rounding=rounding,
+        )
+        index = np.flatnonzero(valid.to_numpy())
+        summary.loc[index, 'monthly_payment'] = result['monthly_payment']
+        summary.loc[index, 'payoff_month'] = result['payoff_month']
+        summary.loc[index, 'end_date'] = _labels(good['start_date'].reset_index(drop=True), result['payoff_month'] - 1)
+        summary.loc[index, 'total_principal_paid'] = result['total_principal_paid']
+        summary.loc[index, 'total_interest_paid'] = result['total_interest_paid']
+        if with_schedules:
+            schedules = _schedules(good, rounding)
+    return summary, schedules
+
+
+def _process_task(task):
+    return process_chunk(*task)
+
+
+class _Writer:
+    # Appends DataFrames to one CSV or Parquet file
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.writer = None
+        self.started = False
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table.cast(self.writer.schema))
+        else:
+            frame.to_csv(self.path, mode='a' if self.started else 'w', header=not self.started, index=False)
+        self.started = True
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _ordered_results(tasks, processes):
+    # Results in input order with at most two chunks per worker in flight, so memory stays flat
+    if not processes or processes <= 1:
+        yield from map(_process_task, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_process_task, task))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_portfolio(input_path, summary_path, schedule_path=None, chunk_size=CHUNK_SIZE, processes=None, progress=sys.stderr, rounding=None):
+    """Stream ``input_path`` through the engine, writing per-loan summaries to ``summary_path``
+    and, if given, full monthly schedules to ``schedule_path`` (with at most
+    SCHEDULE_CHUNK_SIZE loans per chunk). ``rounding`` selects the whole-pence engine, as for
+    process_chunk.
+
+    Chunks are spread over ``processes`` worker processes and written in input order. Reports
+    throughput to ``progress`` after every chunk and returns the final counts.
+    """
+    started = time.perf_counter()
+    if schedule_path:
+        chunk_size = min(chunk_size, SCHEDULE_CHUNK_SIZE)
+
+    def tasks():
+        first_row = 0
+        for loans in read_loans(input_path, chunk_size):
+            yield loans, first_row, schedule_path is not None, rounding
+            first_row += len(loans)
+
+    summaries = _Writer(summary_path)
+    schedules = _Writer(schedule_path) if schedule_path else None
+    loans = errors = 0
+    try:
+        for summary, schedule in _ordered_results(tasks(), processes):
+            summaries.write(summary)
+            if schedules is not None and schedule is not None:
+                schedules.write(schedule)
+            loans += len(summary)
+            errors += int(summary['error'].notna().sum())
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                print(f"{loans:,} loans in {elapsed:.1f}s ({loans / elapsed:,.0f} loans/s), {errors:,} errors", file=progress)
+    finally:
+        summaries.close()
+        if schedules is not None:
+            schedules.close()
+    return {'loans': loans, 'errors': errors, 'seconds': time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Mortgage Buddy calculations for a file of loans.")
+    parser.add_argument('input', help="CSV or Parquet file of loans")
+    parser.add_argument('summaries', help="Output file for per-loan summaries (.csv or .parquet)")
+    parser.add_argument('--schedules', help="Optional output file for full monthly schedules (.csv or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"Loans per chunk (at most {SCHEDULE_CHUNK_SIZE} with --schedules)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help="Worker processes (1 runs in-process)")
+    parser.add_argument('--rounding', choices=ROUNDINGS, help="Work in whole pence, rounding each month's interest this way")
+    args = parser.parse_args(argv)
+    stats = run_portfolio(args.input, args.summaries, args.schedules, args.chunk_size, args.processes, rounding=args.rounding)
+    print(f"Done: {stats['loans']:,} loans, {stats['errors']:,} errors in {stats['seconds']:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Ranking of remortgage products by what they cost over a chosen horizon.
+
+The product file is CSV or Parquet with one product per row. Required columns: initial_rate,
+fixed_years, reversion_rate, arrangement_fee and max_ltv (rates and LTVs in %). Any other
+columns, such as lender or product, are carried through to the ranking. The file is read from
+MORTGAGE_BUDDY_PRODUCTS (products.csv by default).
+"""
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from calculations import _annuity_weight
+
+PRODUCTS_ENV = 'MORTGAGE_BUDDY_PRODUCTS'
+DEFAULT_PRODUCTS = 'products.csv'
+REQUIRED_COLUMNS = ('initial_rate', 'fixed_years', 'reversion_rate', 'arrangement_fee', 'max_ltv')
+COST_CACHE_SIZE = 64
+
+
+def _balance_after(balance, monthly_rate, payment, months):
+    # Balance left after paying `payment` for `months` months, per product
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.expm1(months * np.log1p(monthly_rate))
+        return np.where(monthly_rate == 0, balance - payment * months, balance * (growth + 1) - payment * growth / monthly_rate)
+
+
+def _payment(balance, monthly_rate, months):
+    # Annuity payment clearing `balance` over `months`, zero where no months are left
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = balance * np.where(monthly_rate == 0, 1.0, monthly_rate) / _annuity_weight(monthly_rate, months)
+    return np.where(months > 0, payment, 0.0)
+
+
+class ProductTable:
+    """Products sorted by maximum LTV, so the deals open to a given LTV are one contiguous slice.
+
+    Costs of the eligible slice are kept per (balance, term, horizon, LTV band), so reruns
+    with the same inputs only re-sort.
+    """
+
+    def __init__(self, products):
+        missing = [column for column in REQUIRED_COLUMNS if column not in products]
+        if missing:
+            raise ValueError(f"The product file is missing the columns: {', '.join(missing)}.")
+        self.products = products.dropna(subset=list(REQUIRED_COLUMNS)).sort_values('max_ltv', kind='stable').reset_index(drop=True)
+        self.max_ltv = self.products['max_ltv'].to_numpy(float)
+        self.initial_rate = self.products['initial_rate'].to_numpy(float) / 100 / 12
+        self.reversion_rate = self.products['reversion_rate'].to_numpy(float) / 100 / 12
+        self.fixed_months = np.rint(self.products['fixed_years'].to_numpy(float) * 12).astype(np.int64)
+        self.fee = self.products['arrangement_fee'].to_numpy(float)
+        self._costs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.products)
+
+    def eligible(self, ltv):
+        """Slice of the products whose maximum LTV is at least ``ltv``."""
+        return slice(int(np.searchsorted(self.max_ltv, ltv, side='left')), len(self))
+
+    def costs(self, balance, years_left, ltv, horizon_years):
+        """Cost arrays for the products eligible at ``ltv``, over ``horizon_years`` of the term.
+
+        Every product pays its initial rate for its fixed period, then its reversion rate with
+        the payment recomputed over the rest of the term. All eligible products are costed at
+        once in closed form. Returns a dict of arrays: the initial and reversion payments, the
+        interest and total cost (interest plus fee) over the horizon, and the balance left at
+        the end of it.
+        """
+        rows = self.eligible(ltv)
+        num_payments = int(years_left * 12)
+        horizon = min(int(horizon_years * 12), num_payments)
+        key = (round(float(balance), 2), num_payments, horizon, rows.start)
+        with self._lock:
+            if key in self._costs:
+                self._costs.move_to_end(key)
+                return self._costs[key]
+
+        initial_rate, reversion_rate = self.initial_rate[rows], self.reversion_rate[rows]
+        fixed_end = np.minimum(self.fixed_months[rows], num_payments)
+        initial_payment = _payment(balance, initial_rate, np.full(len(fixed_end), num_payments))
+        reversion_payment = _payment(_balance_after(balance, initial_rate, initial_payment, fixed_end), reversion_rate, num_payments - fixed_end)
+        # Months at each rate within the horizon
+        fixed = np.minimum(fixed_end, horizon)
+        after_fixed = _balance_after(balance, initial_rate, initial_payment, fixed)
+        remaining = np.maximum(_balance_after(after_fixed, reversion_rate, reversion_payment, horizon - fixed), 0.0)
+        interest = initial_payment * fixed + reversion_payment * (horizon - fixed) - (balance - remaining)
+        costs = {
+            'initial_payment': initial_payment,
+            'reversion_payment': reversion_payment,
+            'interest': interest,
+            'total_cost': interest + self.fee[rows],
+            'balance_at_horizon': remaining,
+        }
+        with self._lock:
+            self._costs[key] = costs
+            while len(self._costs) > COST_CACHE_SIZE:
+                self._costs.popitem(last=False)
+        return costs
+
+    def rank(self, balance, years_left, ltv, horizon_years, top=20):
+        """The ``top`` cheapest products over the horizon as a DataFrame, cheapest first."""
+        rows = self.eligible(ltv)
+        costs = self.costs(balance, years_left, ltv, horizon_years)
+        total = costs['total_cost']
+        best = np.argpartition(total, top - 1)[:top] if top < len(total) else np.arange(len(total))
+        best = best[np.argsort(total[best], kind='stable')]
+        ranking = self.products.iloc[rows.start + best].reset_index(drop=True)
+        ranking['Monthly Payment'] = np.round(costs['initial_payment'][best], 2)
+        ranking['Payment After Fixed Period'] = np.round(costs['reversion_payment'][best], 2)
+        ranking['Interest'] = np.round(costs['interest'][best], 2)
+        ranking['Total Cost'] = np.round(total[best], 2)
+        ranking['Balance at Horizon'] = np.round(costs['balance_at_horizon'][best], 2)
+        return ranking
+
+
+def products_path():
+    return os.environ.get(PRODUCTS_ENV, DEFAULT_PRODUCTS)
+
+
+@lru_cache(maxsize=4)
+def _load(path, modified, size):
+    products = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    return ProductTable(products)
+
+
+def load_products(path=None):
+    """The ProductTable for ``path`` (default: products_path()), reloaded when the file changes."""
+    path = path or products_path()
+    stat = os.stat(path)
+    return _load(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from calculations import calculate_schedule
+
+# Defaults sized for a single app container; every session in the process shares the one cache
+MAX_ENTRIES = 512
+MAX_BYTES = 64 * 1024 * 1024
+TTL_SECONDS = 6 * 60 * 60
+
+
+class ScheduleCache:
+    """Thread-safe LRU cache with a TTL and a byte budget, keyed by normalized inputs."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic(), value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+schedule_cache = ScheduleCache()
+
+
+def schedule_key(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None):
+    """Normalize calculate_mortgage_payments arguments into a hashable cache key."""
+    # A schedule without a start date begins today, so today's date is part of its identity
+    start_date = date.today() if start_date is None else start_date
+    if not (new_rate and new_rate_date):
+        new_rate, new_rate_date = None, None
+    else:
+        new_rate, new_rate_date = round(float(new_rate), 6), new_rate_date.isoformat()
+    if rate_path is not None:
+        rate_path = tuple(sorted((effective_date.isoformat(), round(float(rate), 6)) for effective_date, rate in rate_path))
+    return (
+        round(float(interest_rate), 6),
+        int(years_left),
+        round(float(balance), 2),
+        round(float(additional_repayment), 2),
+        round(float(lump_sum), 2) if lump_sum > 0 else 0.0,
+        start_date.isoformat(),
+        new_rate,
+        new_rate_date,
+        rate_path,
+    )
+
+
+def cached_schedule(interest_rate, years_left, balance, additional_repayment=0, lump_sum=0, start_date=None, new_rate=None, new_rate_date=None, rate_path=None, cache=None):
+    """calculate_schedule backed by the shared schedule cache.
+
+    The Schedule is shared, not copied; its arrays are read-only.
+    """
+    cache = schedule_cache if cache is None else cache
+    key = schedule_key(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path)
+    schedule = cache.get(key)
+    if schedule is None:
+        schedule = calculate_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, new_rate, new_rate_date, rate_path)
+        cache.put(key, schedule, schedule.nbytes)
+    return schedule
+
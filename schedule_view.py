@@ -0,0 +1,82 @@
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from calculations import calendar_periods
+from instrumentation import measure, phase
+
+# Months per chart point for each chart view
+VIEWS = {'Yearly': 12, 'Quarterly': 3, 'Monthly': 1}
+PAGE_SIZE = 60
+MAX_CHART_POINTS = 200
+
+
+def lttb_indices(values, points):
+    """Indices of at most ``points`` samples of ``values`` chosen by largest-triangle-three-buckets.
+
+    The first and last samples are always kept; every bucket in between contributes the sample
+    forming the largest triangle with the previous pick and the next bucket's average.
+    """
+    n = len(values)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    selected = np.empty(points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        next_low, next_high = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        average_x, average_y = x[next_low:next_high].mean(), values[next_low:next_high].mean()
+        area = np.abs((x[previous] - average_x) * (values[low:high] - values[previous]) - (x[previous] - x[low:high]) * (average_y - values[previous]))
+        previous = low + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def chart_frame(series, view):
+    """Chart data for one of the VIEWS, from a {chart label: (Schedule, column)} dict.
+
+    Yearly and quarterly views aggregate each schedule by calendar period. The monthly view
+    keeps every month, but thins the series with LTTB to at most MAX_CHART_POINTS rows in all.
+    """
+    frame = pd.DataFrame({label: schedule.aggregate(VIEWS[view])[column] for label, (schedule, column) in series.items()})
+    return _thin(frame, view)
+
+
+def band_frame(start, bands, view):
+    """Chart data for one of the VIEWS from {chart label: balance for each month from ``start``},
+    taking each balance at the end of a calendar period as chart_frame does."""
+    months = np.arange(len(next(iter(bands.values()))))
+    first, labels = calendar_periods(start, months, VIEWS[view])
+    last = np.append(first[1:], len(months)) - 1
+    return _thin(pd.DataFrame({label: np.asarray(values)[last] for label, values in bands.items()}, index=pd.Index(labels, name='Date')), view)
+
+
+def _thin(frame, view):
+    # The monthly view's LTTB thinning and time axis, shared by the chart frames
+    if len(frame) > MAX_CHART_POINTS:
+        # Each series picks its share of the points; the chart keeps every month picked by any
+        keep = []
+        for label in frame:
+            valid = np.flatnonzero(frame[label].notna().to_numpy())
+            keep.append(valid[lttb_indices(frame[label].to_numpy()[valid], MAX_CHART_POINTS // len(frame.columns))])
+        frame = frame.iloc[np.unique(np.concatenate(keep))]
+    if VIEWS[view] == 1:
+        # Thinned months are unevenly spaced, so plot them on a time axis
+        frame.index = pd.to_datetime(frame.index, format='%Y-%m').rename('Date')
+    return frame
+
+
+def schedule_table(schedule, key, page_size=PAGE_SIZE):
+    """Show one page of the monthly schedule table; only that page is sent to the browser."""
+    pages = max(1, math.ceil(len(schedule) / page_size))
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = 1
+    page = st.number_input('Page', min_value=1, max_value=pages, step=1, key=key)
+    first = (page - 1) * page_size
+    st.caption(f"Months {first + 1} to {min(first + page_size, len(schedule))} of {len(schedule)} (page {page} of {pages})")
+    with phase('st.dataframe') as record:
+        st.dataframe(measure(record, schedule.to_arrow(first, first + page_size)), hide_index=True)
@@ -1,19 +1,66 @@
 import streamlit as st
-import locale
-import pandas as pd
-from calculations import calculate_mortgage_payments
-
-# Set the locale to the user's default setting (for number formatting)
-locale.setlocale(locale.LC_ALL, '')
+from datetime import date
+from background import as_ready, cancel, completed, submit
+from instrumentation import measure, phase
+from startup import parse_number
 
 # Example date formatting function
 def format_date(date_str):
     if date_str is None:
         return "N/A"
+    import pandas as pd
     date = pd.to_datetime(date_str)
     return date.strftime('%B %Y')
 
+def rate_path_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date):
+    # One incremental engine per session, so editing a later rate only replays the months after it
+    from calculations import RatePathSchedule
+    key = (interest_rate, years_left, balance, additional_repayment, lump_sum, start_date)
+    stored = st.session_state.get('rate_path_schedule')
+    if stored is None or stored[0] != key:
+        stored = (key, RatePathSchedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date))
+        st.session_state['rate_path_schedule'] = stored
+    return stored[1]
+
+def display_schedules(jobs):
+    # Simulation tables and charts, each filled in as its background job finishes
+    import pandas as pd
+    from schedule_view import VIEWS, band_frame, chart_frame, schedule_table
+    old_area, new_area = st.container(), st.container()
+    view = st.radio('Chart detail', list(VIEWS), horizontal=True, key='simulation_chart_view')
+    chart_area, fan_area = st.columns(2) if 'fan' in jobs else (st.container(), None)
+    status = st.empty()
+    schedules = {}
+    for label, future in as_ready(jobs, status):
+        if label == 'fan':
+            simulation = future.result()
+            with fan_area:
+                # The same periods as the balance chart beside it
+                fan_data = band_frame(simulation['start'], {f'P{pct}': band for pct, band in simulation['balance'].items()}, view)
+                with phase('st.line_chart') as record:
+                    st.line_chart(measure(record, fan_data))
+                st.dataframe(pd.DataFrame({
+                    'Total Interest': simulation['total_interest_paid'],
+                    'End Date': simulation['end_date'],
+                }).rename(index=lambda pct: f'P{pct}'))
+            continue
+
+        schedules[label] = future.result()
+        with old_area if label == 'old' else new_area:
+            st.write(f"Monthly Mortgage Repayment Schedule ({'Old' if label == 'old' else 'New'} parameters):")
+            schedule_table(schedules[label], key=f'simulation_{label}_page')
+        if len(schedules) == 2:
+            # Plot the data; the new schedule may end earlier, leaving its tail empty
+            with phase('chart data'):
+                chart_data = chart_frame({
+                    'Old Parameters': (schedules['old'], 'Remaining Balance'),
+                    'New Parameters': (schedules['new'], 'Remaining Balance'),
+                }, view)
+            with chart_area, phase('st.line_chart') as record:
+                st.line_chart(measure(record, chart_data))
+
 def display_simulation_and_analysis():
+    import pandas as pd
     col1, col2 = st.columns(2)
 
     with col1:
@@ -21,7 +68,8 @@ def display_simulation_and_analysis():
         additional_repayment = st.number_input('Additional Monthly Repayment', min_value=0.0, value=0.0, step=100.0, help="Additional monthly payment increase")
         lump_sum = st.number_input('One Time Lump Sum (optional)', min_value=0.0, value=0.0, step=1000.0, help="If you were to pay in a one off lump sum")
         balance_input = st.text_input('Current Mortgage Balance (for simulation)', value='250,000')
-        balance = locale.atof(balance_input.replace(',', ''))
+        with phase('parse'):
+            balance = parse_number(balance_input)
 
         if lump_sum > balance:
             st.warning("Lump sum payment exceeds the mortgage balance.")
@@ -31,6 +79,64 @@ def display_simulation_and_analysis():
             new_rate = st.number_input('New Mortgage Rate (%) (optional)', min_value=0.0, value=0.0, step=0.1, help="New mortgage rate")
             new_rate_date = st.date_input("Date for New Rate to Kick In (optional)", value=None, help="Date from which new rate is effective")
 
+        # Several consecutive rates, e.g. fixed periods followed by a variable rate
+        with st.expander("Rate path (optional)"):
+            st.caption("Replaces the single new rate above when filled in.")
+            rate_path_table = st.data_editor(
+                pd.DataFrame({'Effective Date': pd.Series(dtype='datetime64[ns]'), 'Rate (%)': pd.Series(dtype=float)}),
+                num_rows='dynamic', key='rate_path_editor', use_container_width=True,
+                column_config={'Effective Date': st.column_config.DateColumn(), 'Rate (%)': st.column_config.NumberColumn(min_value=0.0, step=0.1)}
+            )
+        rate_path = tuple(
+            (pd.Timestamp(row['Effective Date']).date(), float(row['Rate (%)']))
+            for _, row in rate_path_table.dropna().iterrows()
+        )
+
+        # Random rate paths from the new rate date (or straight away), shown as a fan chart
+        with st.expander("Stochastic rates (optional)"):
+            stochastic = st.checkbox('Simulate random rate paths', value=False, help="Shows percentile bands of the remaining balance next to the balance chart")
+            num_paths = st.number_input('Number of paths', min_value=100, max_value=100000, value=10000, step=1000)
+            volatility = st.number_input('Rate volatility (% points per year)', min_value=0.0, value=1.0, step=0.1)
+            reversion = st.number_input('Mean reversion speed (per year)', min_value=0.0, value=0.2, step=0.05)
+            long_run_rate = st.number_input('Long-run rate (%)', min_value=0.0, value=4.0, step=0.1)
+            seed = st.number_input('Random seed', min_value=0, value=42, step=1)
+
+        # Solve for the overpayment instead of trying values one run at a time
+        with st.expander("Overpayment planner (optional)"):
+            target = st.radio('Target', ['Mortgage-free by', 'Total interest at most', 'Monthly payment at most'], horizontal=True)
+            if target == 'Mortgage-free by':
+                target_date = st.date_input('Target end date', value=None)
+            else:
+                target_amount = st.number_input('Target amount', min_value=0.0, value=0.0, step=1000.0 if target == 'Total interest at most' else 50.0)
+            if st.button('Solve'):
+                from overpayment_solver import solve_lump_sum, solve_overpayment, solve_overpayments
+                interest_rate = st.session_state.get('interest_rate', 3.5)
+                years_left = st.session_state.get('years_left', 30)
+                start_date = st.session_state.get('start_date', None)
+                planner_rate = new_rate if new_rate > 0 and new_rate_date else None
+                planner_rate_date = new_rate_date if planner_rate else None
+                with phase('solver'):
+                    try:
+                        if target == 'Mortgage-free by':
+                            if target_date is None:
+                                raise ValueError("Please choose a target end date.")
+                            overpayment = solve_overpayment(interest_rate, years_left, balance, end_date=target_date, lump_sum=lump_sum, start_date=start_date, new_rate=planner_rate, new_rate_date=planner_rate_date, rate_path=rate_path or None)
+                            st.write(f"Additional monthly repayment needed: **{overpayment:,.2f}**")
+                            if not rate_path:
+                                # The same question for every year of the remaining term, solved in one vectorized pass
+                                first_year = (start_date or date.today()).year + 1
+                                years = list(range(first_year, first_year + int(years_left)))
+                                overpayments = solve_overpayments(interest_rate, years_left, balance, [date(year, 12, 1) for year in years], lump_sum=lump_sum, start_date=start_date, new_rate=planner_rate, new_rate_date=planner_rate_date)
+                                st.dataframe(pd.DataFrame({'Mortgage-free by end of': years, 'Additional Monthly Repayment': overpayments}), hide_index=True)
+                        elif target == 'Total interest at most':
+                            overpayment = solve_overpayment(interest_rate, years_left, balance, max_interest=target_amount, lump_sum=lump_sum, start_date=start_date, new_rate=planner_rate, new_rate_date=planner_rate_date, rate_path=rate_path or None)
+                            st.write(f"Additional monthly repayment needed: **{overpayment:,.2f}**")
+                        else:
+                            needed = solve_lump_sum(interest_rate, years_left, balance, monthly_budget=target_amount, additional_repayment=additional_repayment, start_date=start_date, new_rate=planner_rate, new_rate_date=planner_rate_date, rate_path=rate_path or None)
+                            st.write(f"Lump sum needed to keep every monthly payment within budget: **{needed:,.2f}**")
+                    except ValueError as error:
+                        st.error(str(error))
+
         # Validation for new rate and date fields
         if (new_rate > 0 and not new_rate_date) or (new_rate_date and new_rate == 0.0):
             st.warning("Both the new mortgage rate and the date it kicks in must be provided together.")
@@ -39,111 +145,145 @@ def display_simulation_and_analysis():
             if (new_rate > 0 and not new_rate_date) or (new_rate_date and new_rate == 0.0):
                 st.warning("Both the new mortgage rate and the date it kicks in must be provided together.")
             else:
-                try:
-                    if balance > 0:
-                        interest_rate = st.session_state.get('interest_rate', 3.5)
-                        years_left = st.session_state.get('years_left', 30)
-                        start_date = st.session_state.get('start_date', None)
-
-                        schedule_without_additional, total_principal_paid_without_additional, total_interest_paid_without_additional, _ = calculate_mortgage_payments(interest_rate, years_left, balance, 0, 0, start_date)
-                        schedule_with_additional, total_principal_paid_with_additional, total_interest_paid_with_additional, total_monthly_payment_with_additional = calculate_mortgage_payments(
-                            interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, 
-                            new_rate if new_rate > 0 else None, new_rate_date if new_rate_date else None
-                        )
+                # Keep the simulated inputs so the results survive the rerun that showing the schedules causes
+                st.session_state['simulation_inputs'] = (additional_repayment, lump_sum, balance, new_rate, new_rate_date, rate_path)
 
-                        st.write('Monthly Mortgage Repayment Schedule (Old parameters):')
-                        st.dataframe(schedule_without_additional)
-                        st.write('Monthly Mortgage Repayment Schedule (New parameters):')
-                        st.dataframe(schedule_with_additional)
-
-                        # Plot the data
-                        chart_data = pd.DataFrame({
-                            'Date': schedule_without_additional['Date'],
-                            'Old Parameters': schedule_without_additional['Remaining Balance'],
-                            'New Parameters': schedule_with_additional['Remaining Balance']
-                        }).set_index('Date')
-                        st.line_chart(chart_data)
-
-                        # Calculate end dates
-                        end_date_without_additional = schedule_without_additional['Date'].iloc[-1]
-                        end_date_with_additional = schedule_with_additional['Date'].iloc[-1]
-
-                        # Save values to session state
-                        st.session_state['total_principal_paid_without_additional'] = total_principal_paid_without_additional
-                        st.session_state['total_interest_paid_without_additional'] = total_interest_paid_without_additional
-                        st.session_state['total_principal_paid_with_additional'] = total_principal_paid_with_additional
-                        st.session_state['total_interest_paid_with_additional'] = total_interest_paid_with_additional
-                        st.session_state['additional_repayment'] = additional_repayment
-                        st.session_state['new_rate'] = new_rate
-                        st.session_state['new_rate_date'] = new_rate_date
-                        st.session_state['end_date_without_additional'] = end_date_without_additional
-                        st.session_state['end_date_with_additional'] = end_date_with_additional
-                        st.session_state['total_monthly_payment_with_additional'] = total_monthly_payment_with_additional
-                        st.session_state['lump_sum'] = lump_sum
-                        st.session_state['years_left'] = years_left
-
-                        # Formatting the dates
-                        new_rate_date = format_date(st.session_state['new_rate_date'])
-                        end_date_without_additional = format_date(st.session_state['end_date_without_additional'])
-                        end_date_with_additional = format_date(st.session_state['end_date_with_additional'])
-
-                        # Display the summary in the right column
-                        with col2:
-                            st.header("Summary")
-                            interest_savings = total_interest_paid_without_additional - total_interest_paid_with_additional
-                            total_sum_old = total_principal_paid_without_additional + total_interest_paid_without_additional
-                            total_sum_new = total_principal_paid_with_additional + total_interest_paid_with_additional
-                            lump_sum_savings = total_interest_paid_without_additional - total_interest_paid_with_additional
-
-                            # Generating the summary text with bold variables
-                            if new_rate > 0 and additional_repayment > 0 and lump_sum > 0:
-                                summary_text = (
-                                    f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
-                                    f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
-                                    f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**.\n\n"
-                                    f"By having an additional repayment of **{additional_repayment:,.2f}**, and a lump sum of **{lump_sum:,.2f}**, you can mitigate the impact of the rate change, making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
-                                    f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**.\n\n"
-                                    f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
-                                )
-                            elif additional_repayment > 0 and lump_sum > 0:
-                                summary_text = (
-                                    f"With an additional monthly repayment of **{additional_repayment:,.2f}**, and a lump sum of **{lump_sum:,.2f}**, the end date would be **{end_date_with_additional}** instead of **{end_date_without_additional}**, "
-                                    f"making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
-                                    f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**.\n\n"
-                                    f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
-                                )
-                            elif new_rate > 0 and lump_sum > 0:
-                                summary_text = (
-                                    f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
-                                    f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
-                                    f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**.\n\n"
-                                    f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
-                                )
-                            elif additional_repayment > 0:
-                                summary_text = (
-                                    f"With an additional monthly repayment of **{additional_repayment:,.2f}**, the end date would be **{end_date_with_additional}** instead of **{end_date_without_additional}**, "
-                                    f"making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
-                                    f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**."
-                                )
-                            elif new_rate > 0:
-                                summary_text = (
-                                    f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
-                                    f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
-                                    f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**."
-                                )
-                            elif lump_sum > 0:
-                                summary_text = (
-                                    f"By making a one-time lump sum payment of **{lump_sum:,.2f}**, the total interest would be **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}**, "
-                                    f"saving you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
-                                )
-                            else:
-                                summary_text = (
-                                    f"Without any changes, you will pay off your mortgage by **{end_date_without_additional}** with no interest savings."
-                                )
-
-                            st.markdown(summary_text, unsafe_allow_html=True)
+        if st.session_state.get('simulation_inputs'):
+            from calculations import mortgage_summary, Schedule
+            from monte_carlo import monte_carlo_schedule
+            from schedule_cache import cached_schedule
+            additional_repayment, lump_sum, balance, new_rate, new_rate_date, rate_path = st.session_state['simulation_inputs']
+            if rate_path:
+                # The summary text describes the first change on the path
+                new_rate_date, new_rate = min(rate_path)
+            try:
+                if balance > 0:
+                    interest_rate = st.session_state.get('interest_rate', 3.5)
+                    years_left = st.session_state.get('years_left', 30)
+                    start_date = st.session_state.get('start_date', None)
 
+                    # The summary only needs totals and end dates, which come straight from the annuity formulas
+                    with phase('summary'):
+                        summary_without_additional = mortgage_summary(interest_rate, years_left, balance, 0, 0, start_date)
+                        summary_with_additional = mortgage_summary(
+                            interest_rate, years_left, balance, additional_repayment, lump_sum, start_date,
+                            new_rate if new_rate > 0 else None, new_rate_date if new_rate_date else None, rate_path or None
+                        )
+                    total_principal_paid_without_additional = summary_without_additional['total_principal_paid']
+                    total_interest_paid_without_additional = summary_without_additional['total_interest_paid']
+                    total_principal_paid_with_additional = summary_with_additional['total_principal_paid']
+                    total_interest_paid_with_additional = summary_with_additional['total_interest_paid']
+                    total_monthly_payment_with_additional = summary_with_additional['monthly_payment']
+
+                    # Full schedules (and the stochastic fan chart) are only built when asked for. They are
+                    # computed on the worker pool and fill in below the toggle after the summary is shown.
+                    show_schedules = st.toggle('Show repayment schedules and chart', key='show_simulation_schedules')
+                    schedule_area = st.container()
+                    if show_schedules:
+                        rate_change = (new_rate if new_rate > 0 else None, new_rate_date if new_rate_date else None)
+                        jobs = {'old': submit('simulation.old', (interest_rate, years_left, balance, start_date), cached_schedule, interest_rate, years_left, balance, 0, 0, start_date)}
+                        if rate_path:
+                            # The incremental engine belongs to this session and replays only edited months, so it runs here
+                            cancel('simulation.new')
+                            jobs['new'] = completed(Schedule(rate_path_schedule(interest_rate, years_left, balance, additional_repayment, lump_sum, start_date).update(rate_path)))
+                        else:
+                            new_args = (interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, *rate_change)
+                            jobs['new'] = submit('simulation.new', new_args, cached_schedule, *new_args)
+                        if stochastic:
+                            simulation_args = (
+                                interest_rate, years_left, balance, additional_repayment, lump_sum, start_date, rate_change[1], rate_change[0],
+                                long_run_rate, reversion, volatility, int(num_paths), int(seed)
+                            )
+                            jobs['fan'] = submit('simulation.monte_carlo', simulation_args, monte_carlo_schedule, *simulation_args, cancellable=True)
+                        else:
+                            cancel('simulation.monte_carlo')
                     else:
-                        st.error("Current Mortgage Balance must be greater than 0.")
-                except ValueError:
-                    st.error("Please enter a valid number for the Current Mortgage Balance.")
+                        cancel('simulation.old', 'simulation.new', 'simulation.monte_carlo')
+
+                    # Calculate end dates
+                    end_date_without_additional = summary_without_additional['end_date']
+                    end_date_with_additional = summary_with_additional['end_date']
+
+                    # Save values to session state
+                    st.session_state['total_principal_paid_without_additional'] = total_principal_paid_without_additional
+                    st.session_state['total_interest_paid_without_additional'] = total_interest_paid_without_additional
+                    st.session_state['total_principal_paid_with_additional'] = total_principal_paid_with_additional
+                    st.session_state['total_interest_paid_with_additional'] = total_interest_paid_with_additional
+                    st.session_state['additional_repayment'] = additional_repayment
+                    st.session_state['new_rate'] = new_rate
+                    st.session_state['new_rate_date'] = new_rate_date
+                    st.session_state['end_date_without_additional'] = end_date_without_additional
+                    st.session_state['end_date_with_additional'] = end_date_with_additional
+                    st.session_state['total_monthly_payment_with_additional'] = total_monthly_payment_with_additional
+                    st.session_state['lump_sum'] = lump_sum
+                    st.session_state['years_left'] = years_left
+
+                    # Formatting the dates
+                    new_rate_date = format_date(st.session_state['new_rate_date'])
+                    end_date_without_additional = format_date(st.session_state['end_date_without_additional'])
+                    end_date_with_additional = format_date(st.session_state['end_date_with_additional'])
+
+                    # Display the summary in the right column
+                    with col2:
+                        st.header("Summary")
+                        interest_savings = total_interest_paid_without_additional - total_interest_paid_with_additional
+                        total_sum_old = total_principal_paid_without_additional + total_interest_paid_without_additional
+                        total_sum_new = total_principal_paid_with_additional + total_interest_paid_with_additional
+                        lump_sum_savings = total_interest_paid_without_additional - total_interest_paid_with_additional
+
+                        # Generating the summary text with bold variables
+                        if new_rate > 0 and additional_repayment > 0 and lump_sum > 0:
+                            summary_text = (
+                                f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
+                                f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
+                                f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**.\n\n"
+                                f"By having an additional repayment of **{additional_repayment:,.2f}**, and a lump sum of **{lump_sum:,.2f}**, you can mitigate the impact of the rate change, making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
+                                f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**.\n\n"
+                                f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
+                            )
+                        elif additional_repayment > 0 and lump_sum > 0:
+                            summary_text = (
+                                f"With an additional monthly repayment of **{additional_repayment:,.2f}**, and a lump sum of **{lump_sum:,.2f}**, the end date would be **{end_date_with_additional}** instead of **{end_date_without_additional}**, "
+                                f"making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
+                                f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**.\n\n"
+                                f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
+                            )
+                        elif new_rate > 0 and lump_sum > 0:
+                            summary_text = (
+                                f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
+                                f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
+                                f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**.\n\n"
+                                f"The lump sum payment of **{lump_sum:,.2f}** saves you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
+                            )
+                        elif additional_repayment > 0:
+                            summary_text = (
+                                f"With an additional monthly repayment of **{additional_repayment:,.2f}**, the end date would be **{end_date_with_additional}** instead of **{end_date_without_additional}**, "
+                                f"making the total interest **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}** "
+                                f"and the total sum repaid would be **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}** instead of **{total_principal_paid_without_additional:,.2f} + {total_interest_paid_without_additional:,.2f} = {total_sum_old:,.2f}**."
+                            )
+                        elif new_rate > 0:
+                            summary_text = (
+                                f"With the increased rate of **{new_rate:.2f}%** from **{new_rate_date}**, you will finish your mortgage at **{end_date_with_additional}** and your average monthly mortgage payment will be **{total_monthly_payment_with_additional:,.2f}**, "
+                                f"the total mortgage principal during this time would be **{total_principal_paid_with_additional:,.2f}** and the interest will be **{total_interest_paid_with_additional:,.2f}**, "
+                                f"which would mean the total sum of **{total_principal_paid_with_additional:,.2f} + {total_interest_paid_with_additional:,.2f} = {total_sum_new:,.2f}**."
+                            )
+                        elif lump_sum > 0:
+                            summary_text = (
+                                f"By making a one-time lump sum payment of **{lump_sum:,.2f}**, the total interest would be **{total_interest_paid_with_additional:,.2f}** instead of **{total_interest_paid_without_additional:,.2f}**, "
+                                f"saving you **{lump_sum_savings:,.2f}** in interest over the period of the mortgage."
+                            )
+                        else:
+                            summary_text = (
+                                f"Without any changes, you will pay off your mortgage by **{end_date_without_additional}** with no interest savings."
+                            )
+
+                        st.markdown(summary_text, unsafe_allow_html=True)
+
+                    if show_schedules:
+                        with schedule_area, phase('schedules'):
+                            display_schedules(jobs)
+
+                else:
+                    st.error("Current Mortgage Balance must be greater than 0.")
+            except ValueError:
+                st.error("Please enter a valid number for the Current Mortgage Balance.")
@@ -0,0 +1,130 @@
+"""Process start-up: the locale, a warm-up for the first visitor and the cold-start metric.
+
+The app scales to zero, so the first visitor after a scale-up would otherwise wait for pandas,
+pyarrow and altair to import and for the first schedule to be worked out. Start the app with
+
+    python startup.py --server.port=8080
+
+(any options are passed on to ``streamlit run mortgage.py``) and the warm-up runs while the
+server boots. Under a plain ``streamlit run`` it starts once the first page run has rendered,
+so that it does not hold up that render. For the same reason the pages import pandas and the
+engine modules where they are first used, not at the top of the file.
+
+Once per process, the end of the first page run prints a JSON line to stderr with the seconds
+from process start to that first render, and how long the warm-up took.
+"""
+import json
+import locale
+import os
+import sys
+import threading
+import time
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mortgage.py')
+
+# The default scenario of the Mortgage Details page, worked out by the warm-up
+DEFAULT_RATE = 3.5
+DEFAULT_YEARS = 30
+DEFAULT_BALANCE = 250000.0
+
+_imported = time.perf_counter()
+_lock = threading.Lock()
+_locale_set = False
+_warm_up = None
+_timings = {}
+_cold_start = None
+
+
+def init_locale():
+    """Set the user's default locale (for number formatting) once per process."""
+    global _locale_set
+    with _lock:
+        if not _locale_set:
+            locale.setlocale(locale.LC_ALL, '')
+            _locale_set = True
+
+
+def parse_number(text):
+    """Parse an amount typed with or without thousands separators, e.g. '250,000'."""
+    init_locale()
+    return locale.atof(text.replace(',', ''))
+
+
+def process_age():
+    # Seconds since this process started, from /proc where there is one; otherwise since this
+    # module was imported
+    try:
+        with open('/proc/self/stat') as handle:
+            started = int(handle.read().rsplit(')', 1)[1].split()[19]) / os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime') as handle:
+            return float(handle.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _imported
+
+
+def _warm():
+    started = time.perf_counter()
+    import altair  # noqa: F401  (what st.line_chart draws with)
+    import pyarrow  # noqa: F401
+    import monte_carlo  # noqa: F401
+    import overpay_vs_invest  # noqa: F401
+    import overpayment_solver  # noqa: F401
+    import remortgage  # noqa: F401
+    import savings_engine  # noqa: F401
+    from calculations import mortgage_summary
+    from schedule_cache import cached_schedule
+    from schedule_view import PAGE_SIZE, chart_frame
+    _timings['imports'] = time.perf_counter() - started
+
+    # The schedule behind the first click of "Calculate Mortgage Details" and the simulation's
+    # old parameters, into the shared cache
+    schedule = cached_schedule(DEFAULT_RATE, DEFAULT_YEARS, DEFAULT_BALANCE, 0, 0, None)
+    schedule.to_arrow(0, PAGE_SIZE)
+    chart_frame({name: (schedule, name) for name in ('Principal Payment', 'Interest Payment', 'Total Payment')}, 'Yearly')
+    mortgage_summary(DEFAULT_RATE, DEFAULT_YEARS, DEFAULT_BALANCE, 0, 0, None)
+    _timings['prewarm'] = time.perf_counter() - started
+
+
+def prewarm():
+    """Start the warm-up on a background thread, once per process."""
+    global _warm_up
+    with _lock:
+        if _warm_up is None:
+            _warm_up = threading.Thread(target=_warm, name='mortgage-buddy-warm-up', daemon=True)
+            _warm_up.start()
+
+
+def first_render():
+    """Record the cold start at the end of a page run; only the first call per process does,
+    and starts the warm-up if it is not running yet.
+
+    Returns the metric ({name: seconds}) on that first call and None afterwards.
+    """
+    global _cold_start
+    with _lock:
+        if _cold_start is not None:
+            return None
+        _cold_start = {'first_render': process_age(), **_timings}
+    print(json.dumps({'metric': 'cold_start', **{name: round(seconds, 3) for name, seconds in _cold_start.items()}}), file=sys.stderr, flush=True)
+    prewarm()
+    return _cold_start
+
+
+def cold_start():
+    """The recorded cold-start metric, or None before the first page run has finished."""
+    return _cold_start
+
+
+def main(argv=None):
+    """Start the warm-up, then run the app under Streamlit with the given options."""
+    init_locale()
+    prewarm()
+    from streamlit.web import cli
+    sys.argv = ['streamlit', 'run', APP, *(sys.argv[1:] if argv is None else argv)]
+    sys.exit(cli.main(prog_name='streamlit'))
+
+
+if __name__ == '__main__':
+    # Go through the importable module, so that the pages share its state
+    import startup
+    startup.main()
@@ -1,5 +1,8 @@
 import streamlit as st
 
+import instrumentation
+import startup
+
 def add_logo():
     st.markdown(
         """
@@ -24,3 +27,11 @@ def add_logo():
         """,
         unsafe_allow_html=True,
     )
+
+
+def setup_page(page):
+    """The start of every page: wide layout, locale, the rerun profile and the logo."""
+    st.set_page_config(page_title="Mortgage Buddy", layout="wide")
+    startup.init_locale()
+    instrumentation.start(page)
+    add_logo()